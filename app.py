@@ -4,11 +4,13 @@ Main entry point for the web application
 """
 import os
 import base64
+import binascii
 import time
 import secrets
 import subprocess
 import sys
 import atexit
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, render_template, request, jsonify, Blueprint
 
 # Try to import flask_cors for CORS support
@@ -19,17 +21,6 @@ except ImportError:
     cors_available = False
     print("Warning: flask-cors not available. CORS may cause issues.")
 
-# Safe fallback for predict if ML model module isn't present
-try:
-    from ml.model import predict
-except Exception:
-    def predict(data):
-        return {
-            'warning': 'ml.model.predict not available; using fallback stub',
-            'received_type': data.get('input_type') if isinstance(data, dict) else str(type(data)),
-            'summary': str(data)[:200]
-        }
-
 app = Flask(__name__)
 
 # Enable CORS if available
@@ -43,6 +34,10 @@ api = Blueprint('api', __name__, url_prefix='/api')
 TMP_UPLOAD_DIR = os.path.join(os.path.dirname(__file__), 'tmp_uploads')
 os.makedirs(TMP_UPLOAD_DIR, exist_ok=True)
 
+# Decoding and writing debug copies happens here, off the request thread
+_upload_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='upload-writer')
+atexit.register(_upload_executor.shutdown, wait=True)
+
 # ML server URL (used to forward images). Can be overridden with env var ML_SERVER_URL
 ML_SERVER_URL = os.environ.get('ML_SERVER_URL', 'http://localhost:8081')
 
@@ -92,25 +87,63 @@ except Exception:
     requests = None
 
 
+def _write_temp_file(out_path, file_bytes, b64):
+    """Decode (if needed) and write an upload copy; runs on _upload_executor."""
+    try:
+        if file_bytes is None:
+            file_bytes = base64.b64decode(b64)
+        if not file_bytes:
+            return
+        with open(out_path, 'wb') as fh:
+            fh.write(file_bytes)
+    except Exception as e:
+        print(f"Failed to save upload copy {out_path}: {e}")
+
+
+def _looks_like_base64(b64):
+    """Cheap check that b64 will decode before its decode is queued.
+
+    Short strings are decoded outright; for long ones only a prefix is
+    validated, so the full decode stays off the request thread.
+    """
+    if not isinstance(b64, str):
+        return False
+    try:
+        if len(b64) <= 1024:
+            base64.b64decode(b64)
+        else:
+            prefix = ''.join(b64[:1024].split())
+            base64.b64decode(prefix[:len(prefix) - len(prefix) % 4], validate=True)
+    except (binascii.Error, ValueError):
+        return False
+    return True
+
+
 def save_temp_file(payload):
-    """Save bytes from payload to TMP_UPLOAD_DIR and return the saved path or None.
+    """Queue bytes from payload to be saved in TMP_UPLOAD_DIR and return the path or None.
 
     payload can contain 'file_bytes' (raw bytes) or 'data' (base64 string or data URL).
+    Base64 that fails a quick validity check returns None. Otherwise the decode
+    and the write run in the background, so the returned path is best-effort:
+    the file appears shortly after this returns, unless a problem past the
+    checked prefix makes the background decode fail (logged, no file written).
     """
     try:
         file_bytes = payload.get('file_bytes')
         filename = payload.get('filename')
         input_type = payload.get('input_type', 'data')
 
-        # If no raw bytes, try to decode base64 from 'data'
+        # If no raw bytes, the base64 'data' is decoded in the background
+        b64 = None
         if file_bytes is None and 'data' in payload:
             b64 = payload.get('data')
             if isinstance(b64, str) and b64.startswith('data:'):
                 # strip data URL prefix
                 b64 = b64.split(',', 1)[1]
-            file_bytes = base64.b64decode(b64)
 
-        if not file_bytes:
+        if not file_bytes and not b64:
+            return None
+        if file_bytes is None and not _looks_like_base64(b64):
             return None
 
         # Choose extension
@@ -125,8 +158,7 @@ def save_temp_file(payload):
         out_name = f"{input_type}_{ts}_{token}{ext}"
         out_path = os.path.join(TMP_UPLOAD_DIR, out_name)
 
-        with open(out_path, 'wb') as fh:
-            fh.write(file_bytes)
+        _upload_executor.submit(_write_temp_file, out_path, file_bytes, b64)
 
         return out_path
     except Exception:
@@ -29,6 +29,7 @@ class AIAssistant:
         self.llm_client = OpenRouterClient(api_key=api_key, model=model, backup_models=backup_models)
         self.conversation_history: List[Dict[str, str]] = []
         self.is_active = False
+        self.welcome_message: Optional[str] = None
         
         # System prompt that defines the assistant's behavior
         self.system_prompt = """You are Pika, a cute and caring virtual AI assistant that tracks the user's screen and camera. 
@@ -61,6 +62,7 @@ CRITICAL: When a user wants to set a timer (e.g., "set a timer for 5 minutes", "
         """Start the AI assistant and welcome the user"""
         self.is_active = True
         welcome_message = self._generate_welcome()
+        self.welcome_message = welcome_message  # Reused by the API until the next start/reset
         print(f"Pika: {welcome_message}")
         return welcome_message
     
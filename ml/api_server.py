@@ -5,30 +5,125 @@ Supports both HTTP API server and CLI interactive modes
 import os
 import sys
 import argparse
+import atexit
+import base64
+import functools
+import hashlib
+import io
 import re
-from flask import Flask, request, jsonify
+import secrets
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import orjson
+from cachetools import TTLCache
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from werkzeug.exceptions import BadRequest, HTTPException
 from dotenv import load_dotenv
 from ai_assistant import AIAssistant
 from elevenlabs_client import ElevenLabsClient
 
+# Pillow is optional: without it the vision cache only matches identical frames
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
 # Load environment variables
 load_dotenv()
 
+
+def _orjson_default(obj):
+    """Serialize types orjson doesn't support natively"""
+    if isinstance(obj, (bytes, bytearray)):
+        return base64.b64encode(obj).decode('ascii')
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson
+    
+    Responses embed large base64 audio strings, which orjson serializes several
+    times faster than the standard library. Output is always compact.
+    """
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_orjson_default).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_orjson_default),
+            mimetype="application/json"
+        )
+
+
 # Flask app setup
 app = Flask(__name__)
+app.json_provider_class = OrjsonProvider
+app.json = OrjsonProvider(app)  # jsonify() and request.get_json() go through orjson
 CORS(app)  # Enable CORS for frontend integration
 
-# Global assistant instance
-assistant = None
-elevenlabs_client = None
 welcome_audio_cache = None  # Cache welcome message audio
 
+# TTS model for the (cached) welcome message; live replies use the client's
+# low-latency default (ELEVENLABS_MODEL, eleven_flash_v2_5)
+WELCOME_TTS_MODEL = os.getenv("ELEVENLABS_WELCOME_MODEL", "eleven_multilingual_v2")
 
-def init_assistant():
-    """Initialize the AI assistant with backup model support"""
-    global assistant, elevenlabs_client
+# Debug copies of generated audio under ml/audio_output/ are opt-in; they
+# accumulate indefinitely, so production runs leave this off
+SAVE_DEBUG_AUDIO = os.getenv("SAVE_DEBUG_AUDIO", "0") == "1"
+
+# Shared pool for fire-and-forget side work (debug audio saves, etc.) so
+# handlers don't spawn a thread per request; the queue provides backpressure
+_bg_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='pika-bg')
+atexit.register(_bg_pool.shutdown, wait=False)
+
+# Recent camera analyses keyed by frame hash; consecutive webcam frames are
+# usually near-identical, so this skips a vision round-trip for most of them
+_vision_cache = TTLCache(maxsize=256, ttl=30)
+_vision_cache_lock = threading.Lock()  # cachetools caches are not thread-safe
+
+# Warning audio generated off the request path, fetched by id via GET /audio/<id>
+# (per process, which is why production runs a single gthread worker)
+_tts_cache = TTLCache(maxsize=128, ttl=300)
+_tts_cache_lock = threading.Lock()
+
+
+_assistant = None
+_assistant_lock = threading.Lock()  # Serializes first-time creation only
+
+
+def get_assistant():
+    """
+    Get the shared AI assistant, creating and starting it on first use
+    
+    The first caller pays the initialization cost while concurrent callers wait
+    for it, so only one assistant (and one welcome call) is ever made. Later
+    calls return without taking the lock. Initialization errors are not cached,
+    so the next request retries.
+    """
+    global _assistant
+    assistant = _assistant
+    if assistant is not None:
+        return assistant
     
+    with _assistant_lock:
+        if _assistant is None:
+            _assistant = _create_assistant()
+        return _assistant
+
+
+def _create_assistant():
+    """Build and start the AI assistant from environment configuration"""
     api_key = os.getenv("OPENROUTER_API_KEY")
     model = os.getenv("OPENROUTER_MODEL", "openai/gpt-3.5-turbo")
     
@@ -48,23 +143,145 @@ def init_assistant():
     
     assistant = AIAssistant(api_key=api_key, model=model, backup_models=backup_models)
     assistant.start()
-    
-    # Initialize ElevenLabs client (optional - won't fail if not configured)
+    return assistant
+
+
+@functools.cache
+def get_elevenlabs():
+    """Get the shared ElevenLabs client (optional - None if not configured)"""
     try:
         elevenlabs_api_key = os.getenv("ELEVENLABS_API_KEY")
         if elevenlabs_api_key:
-            elevenlabs_client = ElevenLabsClient(api_key=elevenlabs_api_key)
+            client = ElevenLabsClient(api_key=elevenlabs_api_key)
             print("ElevenLabs client initialized")
-        else:
-            print("ElevenLabs API key not found - audio generation will be disabled")
-            elevenlabs_client = None
+            return client
+        print("ElevenLabs API key not found - audio generation will be disabled")
     except Exception as e:
         print(f"Failed to initialize ElevenLabs: {str(e)}")
-        elevenlabs_client = None
-    
+    return None
+
+
+def assistant_initialized():
+    """Check whether the shared assistant has been created yet (without creating it)"""
+    return _assistant is not None
+
+
+def init_assistant():
+    """Eagerly initialize the AI assistant and ElevenLabs client"""
+    assistant = get_assistant()
+    get_elevenlabs()
     return assistant
 
 
+def save_audio_in_background(client, audio_data, text, label="audio"):
+    """Queue a debug copy of generated audio (save_audio writes behind on its own executor)"""
+    if not SAVE_DEBUG_AUDIO:
+        return
+    
+    try:
+        saved_path = client.save_audio(
+            audio_data=audio_data,
+            text=text,
+            output_dir="audio_output"
+        )
+        print(f"Saved {label}: {saved_path}")
+    except Exception as save_error:
+        print(f"Failed to save {label}: {str(save_error)}")
+
+
+def queue_warning_audio(client, warning_message):
+    """
+    Generate warning audio in the background pool
+    
+    The detect endpoints return immediately with the id; the frontend polls
+    GET /audio/<id> until the audio is ready.
+    
+    Args:
+        client: ElevenLabsClient instance
+        warning_message: Text to convert to speech
+    
+    Returns:
+        Audio id to pass to GET /audio/<id>
+    """
+    audio_id = secrets.token_urlsafe(12)
+    with _tts_cache_lock:
+        _tts_cache[audio_id] = {"status": "pending"}
+    
+    def _generate():
+        try:
+            audio_result = client.text_to_speech(
+                text=warning_message,
+                stability=0.5,
+                similarity_boost=0.75,
+                style=0.2,
+                use_speaker_boost=True,
+                return_base64=False,  # Served as raw bytes by GET /audio/<id>
+                cache=True  # Warnings repeat the same few activities
+            )
+            entry = {"status": "ready", "audio": audio_result["audio_data"]}
+            save_audio_in_background(client, audio_result.get("audio_data"), warning_message, label="warning audio")
+        except Exception as e:
+            print(f"Failed to generate warning audio: {str(e)}")
+            entry = {"status": "error", "error": f"Failed to generate warning audio: {str(e)}"}
+        with _tts_cache_lock:
+            _tts_cache[audio_id] = entry
+    
+    _bg_pool.submit(_generate)
+    return audio_id
+
+
+def json_response(result, status=200):
+    """
+    Serialize a result dict straight to a JSON Response
+    
+    Skips jsonify's provider dispatch for the detect endpoints, whose payloads
+    can carry large base64 audio strings.
+    
+    Args:
+        result: JSON-serializable dict (must not contain raw bytes)
+        status: HTTP status code
+    
+    Returns:
+        Flask Response with an application/json body
+    """
+    return Response(orjson.dumps(result), status=status, mimetype='application/json')
+
+
+def get_request_json():
+    """
+    Parse the JSON request body with orjson ({} for an empty body)
+    
+    Parses the raw bytes once, skipping Flask's JSON machinery, which matters
+    for the large base64 image/audio payloads. The body isn't cached on the
+    request, so the multi-MB buffer is freed once parsed.
+    """
+    try:
+        return orjson.loads(request.get_data(cache=False) or b'{}')
+    except orjson.JSONDecodeError as e:
+        raise BadRequest(f"Invalid JSON data: {str(e)}")
+
+
+@app.errorhandler(Exception)
+def handle_error(e):
+    """Return any unhandled error in the API's standard JSON error format"""
+    if isinstance(e, HTTPException):
+        status_code = e.code
+        message = e.description
+        # Keep headers Werkzeug attaches (e.g. Allow on 405, Retry-After)
+        headers = dict(e.get_response().headers)
+    else:
+        status_code = 500
+        message = f"Error processing request: {str(e)}"
+        headers = {}
+    
+    headers.pop('Content-Length', None)
+    headers['Content-Type'] = 'application/json'
+    return orjson.dumps({
+        "error": message,
+        "status": "error"
+    }), status_code, headers
+
+
 def run_cli_mode():
     """Run the assistant in CLI interactive mode"""
     print("=" * 50)
@@ -132,7 +349,8 @@ def health_check():
     """Health check endpoint"""
     return jsonify({
         "status": "healthy",
-        "service": "Virtual AI Assistant API"
+        "service": "Virtual AI Assistant API",
+        "background_queue": _bg_pool._work_queue.qsize()
     }), 200
 
 
@@ -152,30 +370,20 @@ def welcome():
         "status": "success"
     }
     """
-    global assistant, elevenlabs_client, welcome_audio_cache
-    
-    # Initialize assistant if not already done
-    if assistant is None:
-        try:
-            init_assistant()
-        except Exception as e:
-            return jsonify({
-                "error": f"Failed to initialize assistant: {str(e)}",
-                "status": "error"
-            }), 500
+    global welcome_audio_cache
     
-    # Check if assistant is active
-    if not assistant.is_active:
-        try:
-            assistant.start()
-        except Exception as e:
-            return jsonify({
-                "error": f"Failed to start assistant: {str(e)}",
-                "status": "error"
-            }), 500
+    # Get the shared assistant (initialized on first use)
+    try:
+        assistant = get_assistant()
+    except Exception as e:
+        return jsonify({
+            "error": f"Failed to initialize assistant: {str(e)}",
+            "status": "error"
+        }), 500
+    elevenlabs_client = get_elevenlabs()
     
-    # Get welcome message (regenerate if needed)
-    welcome_message = assistant._generate_welcome()
+    # Get welcome message (generated on start/reset; regenerate if needed)
+    welcome_message = assistant.welcome_message or assistant._generate_welcome()
     
     # Generate audio for welcome message
     audio_data = None
@@ -185,13 +393,15 @@ def welcome():
             audio_data = welcome_audio_cache.get("audio")
         else:
             try:
-                # Generate audio from welcome message
+                # Generate audio from welcome message. The welcome audio is
+                # cached, so prefer the higher quality model over latency here
                 audio_result = elevenlabs_client.text_to_speech(
                     text=welcome_message,
                     stability=0.5,  # Cute, stable voice
                     similarity_boost=0.75,
                     style=0.2,  # Slight expressiveness for Pika's personality
-                    use_speaker_boost=True
+                    use_speaker_boost=True,
+                    model_id=WELCOME_TTS_MODEL
                 )
                 audio_data = {
                     "data": audio_result["audio_base64"],
@@ -203,21 +413,27 @@ def welcome():
                     "message": welcome_message,
                     "audio": audio_data
                 }
-                # Save audio file for debugging (backend only)
-                try:
-                    saved_path = elevenlabs_client.save_audio(
-                        audio_data=audio_result.get("audio_data"),
-                        text=welcome_message,
-                        output_dir="audio_output"
-                    )
-                    print(f"Saved welcome audio: {saved_path}")
-                except Exception as save_error:
-                    print(f"Failed to save welcome audio: {str(save_error)}")
+                # Save audio file for debugging (backend only, off the request path)
+                save_audio_in_background(
+                    elevenlabs_client,
+                    audio_result.get("audio_data"),
+                    welcome_message,
+                    label="welcome audio"
+                )
             except Exception as e:
                 # If audio generation fails, still return text response
                 print(f"Failed to generate welcome audio: {str(e)}")
                 audio_data = None
     
+    # The response only changes when the welcome message (or audio availability)
+    # does, so let the browser revalidate instead of re-downloading the audio
+    etag_source = f"{welcome_message}|{'audio' if audio_data else 'text'}"
+    etag = hashlib.sha256(etag_source.encode()).hexdigest()[:16]
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    
     # Return welcome message with optional audio
     result = {
         "message": welcome_message,
@@ -227,7 +443,10 @@ def welcome():
     if audio_data:
         result["audio"] = audio_data
     
-    return jsonify(result), 200
+    response = jsonify(result)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, must-revalidate'
+    return response, 200
 
 
 def parse_timer_request(message):
@@ -356,116 +575,163 @@ def chat():
         "time": "MM:SS"  // Optional - only included if message is about a timer (e.g., "i want a timer of 3 minutes")
     }
     """
-    global assistant, elevenlabs_client
+    # Get the shared assistant (initialized on first use)
+    try:
+        assistant = get_assistant()
+    except Exception as e:
+        return jsonify({
+            "error": f"Failed to initialize assistant: {str(e)}",
+            "status": "error"
+        }), 500
+    elevenlabs_client = get_elevenlabs()
     
-    # Initialize assistant if not already done
-    if assistant is None:
-        try:
-            init_assistant()
-        except Exception as e:
-            return jsonify({
-                "error": f"Failed to initialize assistant: {str(e)}",
-                "status": "error"
-            }), 500
+    # Get user input from request
+    data = get_request_json()
     
-    # Check if assistant is active
-    if not assistant.is_active:
-        try:
-            assistant.start()
-        except Exception as e:
-            return jsonify({
-                "error": f"Failed to start assistant: {str(e)}",
-                "status": "error"
-            }), 500
+    if not data:
+        return jsonify({
+            "error": "No JSON data provided",
+            "status": "error"
+        }), 400
     
-    # Get user input from request
+    user_message = data.get('message', '').strip()
+    
+    if not user_message:
+        return jsonify({
+            "error": "Message field is required and cannot be empty",
+            "status": "error"
+        }), 400
+    
+    # Process user input through assistant
+    response = assistant.process_user_input(user_message)
+    
+    # Check if the message is about a timer (safely, don't let errors break the response)
+    timer_time = None
     try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                "error": "No JSON data provided",
-                "status": "error"
-            }), 400
-        
-        user_message = data.get('message', '').strip()
-        
-        if not user_message:
-            return jsonify({
-                "error": "Message field is required and cannot be empty",
-                "status": "error"
-            }), 400
-        
-        # Process user input through assistant
-        response = assistant.process_user_input(user_message)
-        
-        # Check if the message is about a timer (safely, don't let errors break the response)
+        timer_time = parse_timer_request(user_message)
+        if timer_time:
+            print(f"[INFO] Timer detected in message: '{user_message}' -> {timer_time}")
+        else:
+            print(f"[DEBUG] No timer detected in message: '{user_message}'")
+    except Exception as e:
+        # If timer parsing fails, just continue without timer field
+        print(f"[WARN] Timer parsing failed: {str(e)}")
         timer_time = None
+    
+    # Generate audio using ElevenLabs if available
+    audio_data = None
+    if elevenlabs_client and response:
         try:
-            timer_time = parse_timer_request(user_message)
-            if timer_time:
-                print(f"[INFO] Timer detected in message: '{user_message}' -> {timer_time}")
-            else:
-                print(f"[DEBUG] No timer detected in message: '{user_message}'")
+            # Generate audio from Pika's response
+            audio_result = elevenlabs_client.text_to_speech(
+                text=response,
+                stability=0.5,  # Cute, stable voice
+                similarity_boost=0.75,
+                style=0.2,  # Slight expressiveness for Pika's personality
+                use_speaker_boost=True
+            )
+            audio_data = {
+                "data": audio_result["audio_base64"],
+                "format": audio_result["format"],
+                "data_url": f"data:audio/{audio_result['format']};base64,{audio_result['audio_base64']}"
+            }
+            # Save audio file for debugging (backend only, off the request path)
+            save_audio_in_background(
+                elevenlabs_client,
+                audio_result.get("audio_data"),
+                response,
+                label="audio"
+            )
         except Exception as e:
-            # If timer parsing fails, just continue without timer field
-            print(f"[WARN] Timer parsing failed: {str(e)}")
-            timer_time = None
-        
-        # Generate audio using ElevenLabs if available
-        audio_data = None
-        if elevenlabs_client and response:
-            try:
-                # Generate audio from Pika's response
-                audio_result = elevenlabs_client.text_to_speech(
-                    text=response,
-                    stability=0.5,  # Cute, stable voice
-                    similarity_boost=0.75,
-                    style=0.2,  # Slight expressiveness for Pika's personality
-                    use_speaker_boost=True
-                )
-                audio_data = {
-                    "data": audio_result["audio_base64"],
-                    "format": audio_result["format"],
-                    "data_url": f"data:audio/{audio_result['format']};base64,{audio_result['audio_base64']}"
-                }
-                # Save audio file for debugging (backend only)
-                try:
-                    saved_path = elevenlabs_client.save_audio(
-                        audio_data=audio_result.get("audio_data"),
-                        text=response,
-                        output_dir="audio_output"
-                    )
-                    print(f"Saved audio: {saved_path}")
-                except Exception as save_error:
-                    print(f"Failed to save audio: {str(save_error)}")
-            except Exception as e:
-                # If audio generation fails, still return text response
-                print(f"Failed to generate audio: {str(e)}")
-                audio_data = None
-        
-        # Return response with optional audio and timer time
-        result = {
-            "response": response,
-            "status": "success"
-        }
-        
-        if audio_data:
-            result["audio"] = audio_data
-        
-        if timer_time:
-            result["time"] = timer_time
-            print(f"[INFO] Including timer in response: {timer_time}")
-        
-        print(f"[DEBUG] Final response keys: {list(result.keys())}")
-        
-        return jsonify(result), 200
+            # If audio generation fails, still return text response
+            print(f"Failed to generate audio: {str(e)}")
+            audio_data = None
     
-    except Exception as e:
+    # Return response with optional audio and timer time
+    result = {
+        "response": response,
+        "status": "success"
+    }
+    
+    if audio_data:
+        result["audio"] = audio_data
+    
+    if timer_time:
+        result["time"] = timer_time
+        print(f"[INFO] Including timer in response: {timer_time}")
+    
+    print(f"[DEBUG] Final response keys: {list(result.keys())}")
+    
+    return jsonify(result), 200
+
+
+def reply_to_transcription(assistant, elevenlabs_client, transcribed_text):
+    """Process transcribed speech through the assistant and build the /voice response"""
+    if not transcribed_text or not transcribed_text.strip():
         return jsonify({
-            "error": f"Error processing request: {str(e)}",
+            "error": "Transcription resulted in empty text",
             "status": "error"
-        }), 500
+        }), 400
+    
+    # Process transcribed text through chat
+    # Call the chat function directly instead of making HTTP request
+    user_message = transcribed_text.strip()
+    response = assistant.process_user_input(user_message)
+    
+    # Check if the message is about a timer (safely, don't let errors break the response)
+    timer_time = None
+    try:
+        print(f"[DEBUG] Checking for timer in voice message: '{user_message}'")
+        timer_time = parse_timer_request(user_message)
+        print(f"[DEBUG] Timer parsing result: {timer_time}")
+    except Exception as e:
+        # If timer parsing fails, just continue without timer field
+        print(f"[WARN] Timer parsing failed: {str(e)}")
+        timer_time = None
+    
+    # Generate audio using ElevenLabs if available
+    audio_data = None
+    if elevenlabs_client and response:
+        try:
+            # Generate audio from assistant's response
+            audio_result = elevenlabs_client.text_to_speech(
+                text=response,
+                stability=0.5,
+                similarity_boost=0.75,
+                style=0.2,
+                use_speaker_boost=True
+            )
+            audio_data = {
+                "data": audio_result["audio_base64"],
+                "format": audio_result["format"],
+                "data_url": f"data:audio/{audio_result['format']};base64,{audio_result['audio_base64']}"
+            }
+            # Save audio file for debugging (backend only, off the request path)
+            save_audio_in_background(
+                elevenlabs_client,
+                audio_result.get("audio_data"),
+                response,
+                label="audio"
+            )
+        except Exception as e:
+            # If audio generation fails, still return text response
+            print(f"Failed to generate audio: {str(e)}")
+            audio_data = None
+    
+    # Return response with transcription, text response, and optional audio
+    result = {
+        "response": response,
+        "transcription": transcribed_text,
+        "status": "success"
+    }
+    
+    if audio_data:
+        result["audio"] = audio_data
+    
+    if timer_time:
+        result["time"] = timer_time
+    
+    return jsonify(result), 200
 
 
 @app.route('/voice', methods=['POST'])
@@ -491,140 +757,110 @@ def voice():
         }
     }
     """
-    global assistant, elevenlabs_client
+    # Get the shared assistant (initialized on first use)
+    try:
+        assistant = get_assistant()
+    except Exception as e:
+        return jsonify({
+            "error": f"Failed to initialize assistant: {str(e)}",
+            "status": "error"
+        }), 500
+    elevenlabs_client = get_elevenlabs()
+    
+    # Get audio from request
+    data = get_request_json()
+    
+    if not data:
+        return jsonify({
+            "error": "No JSON data provided",
+            "status": "error"
+        }), 400
+    
+    audio_base64 = data.get('audio', '').strip()
+    audio_format = data.get('format', 'audio/webm')
+    
+    if not audio_base64:
+        return jsonify({
+            "error": "Audio field is required and cannot be empty",
+            "status": "error"
+        }), 400
     
-    # Initialize assistant if not already done
-    if assistant is None:
+    # Transcribe audio using ElevenLabs
+    transcribed_text = None
+    if elevenlabs_client:
         try:
-            init_assistant()
+            print(f"Transcribing audio: format={audio_format}, base64_length={len(audio_base64)}")
+            transcribed_text = elevenlabs_client.speech_to_text(audio_base64, audio_format)
+            print(f"Transcription: {transcribed_text}")
         except Exception as e:
+            print(f"Failed to transcribe audio: {str(e)}")
             return jsonify({
-                "error": f"Failed to initialize assistant: {str(e)}",
+                "error": f"Failed to transcribe audio: {str(e)}",
                 "status": "error"
             }), 500
+    else:
+        return jsonify({
+            "error": "ElevenLabs client not initialized. Speech-to-text requires ElevenLabs API key.",
+            "status": "error"
+        }), 500
+    
+    return reply_to_transcription(assistant, elevenlabs_client, transcribed_text)
+
+
+@app.route('/voice/binary', methods=['POST'])
+def voice_binary():
+    """
+    Voice input endpoint for raw audio bytes - same as /voice without the base64 step
+    
+    Expected request:
+        Body: raw audio bytes (e.g., Content-Type: application/octet-stream or audio/webm)
+        X-Audio-Format header: MIME type of the audio (optional, default: audio/webm)
+    
+    Returns the same response as /voice. Skipping base64 cuts the upload size by
+    a third and avoids the encode/decode round-trip on both client and server.
+    """
+    # Get the shared assistant (initialized on first use)
+    try:
+        assistant = get_assistant()
+    except Exception as e:
+        return jsonify({
+            "error": f"Failed to initialize assistant: {str(e)}",
+            "status": "error"
+        }), 500
+    elevenlabs_client = get_elevenlabs()
     
-    # Check if assistant is active
-    if not assistant.is_active:
+    # Get audio from request
+    audio_bytes = request.get_data(cache=False)
+    audio_format = request.headers.get('X-Audio-Format')
+    if not audio_format:
+        audio_format = request.mimetype if request.mimetype.startswith('audio/') else 'audio/webm'
+    
+    if not audio_bytes:
+        return jsonify({
+            "error": "Request body must contain audio data",
+            "status": "error"
+        }), 400
+    
+    # Transcribe audio using ElevenLabs
+    transcribed_text = None
+    if elevenlabs_client:
         try:
-            assistant.start()
+            print(f"Transcribing audio: format={audio_format}, size_bytes={len(audio_bytes)}")
+            transcribed_text = elevenlabs_client.speech_to_text_bytes(audio_bytes, audio_format)
+            print(f"Transcription: {transcribed_text}")
         except Exception as e:
+            print(f"Failed to transcribe audio: {str(e)}")
             return jsonify({
-                "error": f"Failed to start assistant: {str(e)}",
+                "error": f"Failed to transcribe audio: {str(e)}",
                 "status": "error"
             }), 500
+    else:
+        return jsonify({
+            "error": "ElevenLabs client not initialized. Speech-to-text requires ElevenLabs API key.",
+            "status": "error"
+        }), 500
     
-    # Get audio from request
-    try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                "error": "No JSON data provided",
-                "status": "error"
-            }), 400
-        
-        audio_base64 = data.get('audio', '').strip()
-        audio_format = data.get('format', 'audio/webm')
-        
-        if not audio_base64:
-            return jsonify({
-                "error": "Audio field is required and cannot be empty",
-                "status": "error"
-            }), 400
-        
-        # Transcribe audio using ElevenLabs
-        transcribed_text = None
-        if elevenlabs_client:
-            try:
-                print(f"Transcribing audio: format={audio_format}, base64_length={len(audio_base64)}")
-                transcribed_text = elevenlabs_client.speech_to_text(audio_base64, audio_format)
-                print(f"Transcription: {transcribed_text}")
-            except Exception as e:
-                print(f"Failed to transcribe audio: {str(e)}")
-                return jsonify({
-                    "error": f"Failed to transcribe audio: {str(e)}",
-                    "status": "error"
-                }), 500
-        else:
-            return jsonify({
-                "error": "ElevenLabs client not initialized. Speech-to-text requires ElevenLabs API key.",
-                "status": "error"
-            }), 500
-        
-        if not transcribed_text or not transcribed_text.strip():
-            return jsonify({
-                "error": "Transcription resulted in empty text",
-                "status": "error"
-            }), 400
-        
-        # Process transcribed text through chat
-        # Call the chat function directly instead of making HTTP request
-        user_message = transcribed_text.strip()
-        response = assistant.process_user_input(user_message)
-        
-        # Check if the message is about a timer (safely, don't let errors break the response)
-        timer_time = None
-        try:
-            print(f"[DEBUG] Checking for timer in voice message: '{user_message}'")
-            timer_time = parse_timer_request(user_message)
-            print(f"[DEBUG] Timer parsing result: {timer_time}")
-        except Exception as e:
-            # If timer parsing fails, just continue without timer field
-            print(f"[WARN] Timer parsing failed: {str(e)}")
-            timer_time = None
-        
-        # Generate audio using ElevenLabs if available
-        audio_data = None
-        if elevenlabs_client and response:
-            try:
-                # Generate audio from assistant's response
-                audio_result = elevenlabs_client.text_to_speech(
-                    text=response,
-                    stability=0.5,
-                    similarity_boost=0.75,
-                    style=0.2,
-                    use_speaker_boost=True
-                )
-                audio_data = {
-                    "data": audio_result["audio_base64"],
-                    "format": audio_result["format"],
-                    "data_url": f"data:audio/{audio_result['format']};base64,{audio_result['audio_base64']}"
-                }
-                # Save audio file for debugging (backend only)
-                try:
-                    saved_path = elevenlabs_client.save_audio(
-                        audio_data=audio_result.get("audio_data"),
-                        text=response,
-                        output_dir="audio_output"
-                    )
-                    print(f"Saved audio: {saved_path}")
-                except Exception as save_error:
-                    print(f"Failed to save audio: {str(save_error)}")
-            except Exception as e:
-                # If audio generation fails, still return text response
-                print(f"Failed to generate audio: {str(e)}")
-                audio_data = None
-        
-        # Return response with transcription, text response, and optional audio
-        result = {
-            "response": response,
-            "transcription": transcribed_text,
-            "status": "success"
-        }
-        
-        if audio_data:
-            result["audio"] = audio_data
-        
-        if timer_time:
-            result["time"] = timer_time
-        
-        return jsonify(result), 200
-    
-    except Exception as e:
-        return jsonify({
-            "error": f"Error processing voice input: {str(e)}",
-            "status": "error"
-        }), 500
+    return reply_to_transcription(assistant, elevenlabs_client, transcribed_text)
 
 
 @app.route('/reset', methods=['POST'])
@@ -638,15 +874,14 @@ def reset():
         "status": "success"
     }
     """
-    global assistant
-    
-    if assistant is None:
+    if not assistant_initialized():
         return jsonify({
             "error": "Assistant not initialized",
             "status": "error"
         }), 400
     
     # Reset conversation history
+    assistant = get_assistant()
     assistant.conversation_history = []
     assistant.start()  # Restart to get new welcome message
     
@@ -660,96 +895,8 @@ def reset():
     }), 200
 
 
-@app.route('/detectscreen', methods=['POST'])
-def detect_screen():
-    """
-    Analyze a screenshot to extract text and detect non-study activities
-    
-    Expected JSON payload:
-    {
-        "image": "base64_encoded_image_string" or "data:image/jpeg;base64,..."
-    }
-    
-    Returns:
-    {
-        "text_extracted": "extracted text from image",
-        "activity_detected": "description of what user is doing",
-        "is_studying": true/false,
-        "analysis": "full AI analysis",
-        "status": "success"
-    }
-    """
-    global assistant, elevenlabs_client
-    
-    # Initialize assistant if not already done
-    if assistant is None:
-        try:
-            init_assistant()
-        except Exception as e:
-            return jsonify({
-                "error": f"Failed to initialize assistant: {str(e)}",
-                "status": "error"
-            }), 500
-    
-    # Get image from request
-    try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                "error": "No JSON data provided",
-                "status": "error"
-            }), 400
-        
-        image_base64 = data.get('image', '').strip()
-        
-        if not image_base64:
-            return jsonify({
-                "error": "Image field is required and cannot be empty",
-                "status": "error"
-            }), 400
-        
-        # Step 1: Extract text using OCR model (specialized for text extraction)
-        # Note: Using gpt-4-turbo as default OCR model since it's reliable for text extraction
-        # Alternative: google/gemini-1.5-pro or google/gemini-1.5-flash (if available)
-        ocr_model = os.getenv("OPENROUTER_OCR_MODEL", "openai/gpt-4-turbo")
-        
-        # Validate OCR model name (prevent common mistakes)
-        if "gemini-pro-vision" in ocr_model.lower():
-            print(f"[WARN] Invalid OCR model '{ocr_model}' detected. Using default 'openai/gpt-4-turbo' instead.")
-            ocr_model = "openai/gpt-4-turbo"
-        ocr_prompt = """Extract all visible text from this image. Include everything you can read:
-- Window titles, tab names, browser tabs
-- Text in documents, web pages, or applications
-- UI elements, buttons, menus, labels
-- Any other readable text on the screen
-
-Provide ONLY the extracted text, nothing else. Be thorough and accurate."""
-        
-        print(f"[INFO] Extracting text using OCR model: {ocr_model}")
-        ocr_result = assistant.llm_client.analyze_image(
-            image_base64=image_base64,
-            prompt=ocr_prompt,
-            model=ocr_model,
-            temperature=0.1,  # Very low temperature for accurate OCR
-            max_tokens=2000,
-            use_backup=False  # OCR should be precise, don't use backup
-        )
-        text_extracted = ocr_result.get("content", "").strip()
-        ocr_model_used = ocr_result.get("model_used", ocr_model)
-        
-        # Step 2: Analyze activity using vision model (for context understanding)
-        vision_model = os.getenv("OPENROUTER_VISION_MODEL", "openai/gpt-4-turbo")
-        activity_prompt = f"""Analyze this screenshot to determine what the user is doing.
-
-EXTRACTED TEXT FROM SCREEN:
-{text_extracted}
-
-Based on the image and the extracted text above, identify:
-1. What activity is the user engaged in?
-2. Is this a study-related activity or a distraction?
-
-IMPORTANT: Only count as "studying" if the user is ACTIVELY ENGAGED in learning or academic work.
+# Study/distraction rules shared by the screen analysis prompts
+_SCREEN_STUDY_RULES = """IMPORTANT: Only count as "studying" if the user is ACTIVELY ENGAGED in learning or academic work.
 
 Study activities (ACTIVE engagement required):
 - Reading and actively studying documents, textbooks, academic articles, research papers
@@ -775,180 +922,77 @@ CRITICAL RULES:
 - If the user is on Discord, Slack, or any messaging/chat platform = NOT studying
 - If the user is scrolling or browsing (not actively working) = NOT studying
 - If the user is viewing announcements, feeds, or notifications = NOT studying
-- Only count as studying if actively creating, writing, coding, or deeply reading educational material
+- Only count as studying if actively creating, writing, coding, or deeply reading educational material"""
+
+# Two-step screen analysis, step 1: OCR
+_SCREEN_OCR_PROMPT = """Extract all visible text from this image. Include everything you can read:
+- Window titles, tab names, browser tabs
+- Text in documents, web pages, or applications
+- UI elements, buttons, menus, labels
+- Any other readable text on the screen
+
+Provide ONLY the extracted text, nothing else. Be thorough and accurate."""
+
+# Two-step screen analysis, step 2: activity (format with text_extracted=<OCR output>)
+_SCREEN_ACTIVITY_PROMPT = """Analyze this screenshot to determine what the user is doing.
+
+EXTRACTED TEXT FROM SCREEN:
+{text_extracted}
+
+Based on the image and the extracted text above, identify:
+1. What activity is the user engaged in?
+2. Is this a study-related activity or a distraction?
+
+""" + _SCREEN_STUDY_RULES + """
 
 Format your response as:
 ACTIVITY: [description of what user is doing]
 IS_STUDYING: [yes or no]
 DETAILS: [additional context about the activity, application/website name, etc.]"""
-        
-        print(f"[INFO] Analyzing activity using vision model: {vision_model}")
-        analysis_result = assistant.llm_client.analyze_image(
-            image_base64=image_base64,
-            prompt=activity_prompt,
-            model=vision_model,
-            temperature=0.3,  # Lower temperature for more consistent analysis
-            max_tokens=1000
-        )
-        
-        analysis_text = analysis_result.get("content", "")
-        
-        # Parse the activity analysis to extract structured information
-        # Note: text_extracted is already set from OCR step above
-        activity_detected = ""
-        is_studying = True
-        details = ""
-        
-        # Try to parse the structured response from activity analysis
-        lines = analysis_text.split("\n")
-        current_section = None
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith("ACTIVITY:"):
-                activity_detected = line.replace("ACTIVITY:", "").strip()
-                current_section = "activity"
-            elif line.startswith("IS_STUDYING:"):
-                is_studying_str = line.replace("IS_STUDYING:", "").strip().lower()
-                is_studying = "yes" in is_studying_str or "true" in is_studying_str
-                current_section = "studying"
-            elif line.startswith("DETAILS:"):
-                details = line.replace("DETAILS:", "").strip()
-                current_section = "details"
-            elif line and current_section:
-                # Continue appending to current section
-                if current_section == "activity":
-                    activity_detected += " " + line
-                elif current_section == "details":
-                    details += " " + line
-        
-        # If parsing didn't work well, use fallback detection
-        if not activity_detected:
-            activity_detected = "Unable to parse activity"
-            # Try to detect keywords from analysis
-            analysis_lower = analysis_text.lower()
-            non_study_keywords = ["reddit", "twitter", "facebook", "instagram", "messaging", "texting", "game", "video", "entertainment", "social media"]
-            study_keywords = ["study", "reading", "coding", "writing", "research", "document", "textbook", "learning"]
-            
-            if any(keyword in analysis_lower for keyword in non_study_keywords):
-                is_studying = False
-                activity_detected = "Non-study activity detected"
-            elif any(keyword in analysis_lower for keyword in study_keywords):
-                is_studying = True
-                activity_detected = "Study activity detected"
-        
-        # Return structured response
-        result = {
-            "text_extracted": text_extracted,
-            "activity_detected": activity_detected,
-            "is_studying": is_studying,
-            "analysis": analysis_text,
-            "ocr_model_used": ocr_model_used,
-            "vision_model_used": analysis_result.get("model_used", vision_model),
-            "status": "success"
-        }
-        
-        if details:
-            result["details"] = details
-        
-        # Generate warning audio if user is not studying
-        if not is_studying and elevenlabs_client and activity_detected:
-            try:
-                # Create warning message
-                warning_message = f"Hey! Looks like you are doing {activity_detected}, you should be focusing!"
-                
-                # Generate audio from warning message
-                audio_result = elevenlabs_client.text_to_speech(
-                    text=warning_message,
-                    stability=0.5,
-                    similarity_boost=0.75,
-                    style=0.2,
-                    use_speaker_boost=True
-                )
-                
-                audio_data = {
-                    "data": audio_result["audio_base64"],
-                    "format": audio_result["format"],
-                    "data_url": f"data:audio/{audio_result['format']};base64,{audio_result['audio_base64']}"
-                }
-                result["audio"] = audio_data
-                result["warning_message"] = warning_message
-                
-                # Save audio file for debugging (backend only)
-                try:
-                    saved_path = elevenlabs_client.save_audio(
-                        audio_data=audio_result.get("audio_data"),
-                        text=warning_message,
-                        output_dir="audio_output"
-                    )
-                    print(f"Saved warning audio: {saved_path}")
-                except Exception as save_error:
-                    print(f"Failed to save warning audio: {str(save_error)}")
-            except Exception as e:
-                # If audio generation fails, still return text response
-                print(f"Failed to generate warning audio: {str(e)}")
-        
-        return jsonify(result), 200
-    
-    except Exception as e:
-        return jsonify({
-            "error": f"Error processing screen detection: {str(e)}",
-            "status": "error"
-        }), 500
 
+# Keyword fallbacks for when the activity analysis can't be parsed. Substring
+# matches (no word boundaries) so e.g. "study" also matches "studying"; each
+# alternation scans the text once instead of once per keyword
+_SCREEN_NON_STUDY_RE = re.compile(
+    r'reddit|twitter|facebook|instagram|messaging|texting|game|video|entertainment|social media',
+    re.IGNORECASE
+)
+_SCREEN_STUDY_RE = re.compile(
+    r'study|reading|coding|writing|research|document|textbook|learning',
+    re.IGNORECASE
+)
 
-@app.route('/detectcamera', methods=['POST'])
-def detect_camera():
-    """
-    Analyze a camera image to detect person presence and study activity
-    
-    Expected JSON payload:
-    {
-        "image": "base64_encoded_image_string" or "data:image/jpeg;base64,..."
-    }
-    
-    Returns:
-    {
-        "person_present": true/false,
-        "activity_detected": "description of what user is doing",
-        "is_studying": true/false,
-        "analysis": "full AI analysis",
-        "status": "success"
-    }
-    """
-    global assistant
-    
-    # Initialize assistant if not already done
-    if assistant is None:
-        try:
-            init_assistant()
-        except Exception as e:
-            return jsonify({
-                "error": f"Failed to initialize assistant: {str(e)}",
-                "status": "error"
-            }), 500
-    
-    # Get image from request
-    try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                "error": "No JSON data provided",
-                "status": "error"
-            }), 400
-        
-        image_base64 = data.get('image', '').strip()
-        
-        if not image_base64:
-            return jsonify({
-                "error": "Image field is required and cannot be empty",
-                "status": "error"
-            }), 400
-        
-        # Analyze camera image using vision model
-        vision_model = os.getenv("OPENROUTER_VISION_MODEL", "openai/gpt-4-turbo")
-        camera_prompt = """Analyze this camera image to determine:
+# Single-call prompt: OCR and activity classification in one structured response
+_SCREEN_COMBINED_PROMPT = """Analyze this screenshot. Extract all visible text and determine what the user is doing.
+
+Include all readable text: window titles, tab names, browser tabs, text in documents, web pages or applications, UI elements, buttons, menus and labels.
+
+""" + _SCREEN_STUDY_RULES + """
+
+Return ONLY a JSON object in this exact format:
+{"text": "all visible text from the screen", "activity": "description of what user is doing", "is_studying": true or false, "details": "additional context about the activity, application/website name, etc."}"""
+
+
+# Matches one "KEY: value" section of the camera analysis, up to the next key
+_CAMERA_FIELD_RE = re.compile(
+    r'^[ \t]*(?P<key>PERSON_PRESENT|ACTIVITY|IS_STUDYING|DETAILS):[ \t]*(?P<val>.*?)'
+    r'(?=^[ \t]*(?:PERSON_PRESENT|ACTIVITY|IS_STUDYING|DETAILS):|\Z)',
+    re.MULTILINE | re.DOTALL
+)
+
+
+# Keyword fallbacks for when the camera analysis can't be parsed (substring
+# matches, same as the screen fallbacks)
+_CAMERA_ABSENCE_RE = re.compile(r'no person|absent|not visible|empty|no one', re.IGNORECASE)
+_CAMERA_PRESENCE_RE = re.compile(r'person|visible|present|seen', re.IGNORECASE)
+_CAMERA_DISTRACTION_RE = re.compile(
+    r'phone|mobile|tablet|device|looking away|distracted|eating|drinking|sleeping',
+    re.IGNORECASE
+)
+
+
+# Camera analysis rules, shared by the single-frame and batch prompts
+_CAMERA_RULES = """Analyze this camera image to determine:
 1. Is there a person visible in the camera frame?
 2. What is the person doing?
 3. Is the person actively studying or distracted?
@@ -984,143 +1028,593 @@ Person is PRESENT but NOT studying if:
 - Person is eating a full meal (not just a quick snack or drink)
 - Person appears completely distracted or not focused on their work environment
 - Person is talking on phone or video calling (not study-related)
-- Person is sleeping or appears completely unengaged
+- Person is sleeping or appears completely unengaged"""
+
+_CAMERA_PROMPT = _CAMERA_RULES + """
 
 Format your response as:
 PERSON_PRESENT: [yes or no]
 ACTIVITY: [description of what person is doing - e.g., "using phone", "looking at screen", "looking at camera", "drinking water", "stretching or taking a break", "absent from camera"]
 IS_STUDYING: [yes or no]
 DETAILS: [additional context - what device they're using, their posture, engagement level, etc.]"""
-        
+
+# Multi-frame prompt for /detectcamera/batch (format with count=<number of frames>)
+_CAMERA_BATCH_PROMPT = _CAMERA_RULES + """
+
+You are given {count} camera frames, in chronological order. Apply the analysis above to EACH frame separately.
+
+Return ONLY a JSON object in this exact format, with exactly one entry per frame, in the same order:
+{{"frames": [{{"person_present": true or false, "activity": "description of what person is doing", "is_studying": true or false, "details": "additional context"}}]}}"""
+
+# Most frames accepted by /detectcamera/batch in one request
+CAMERA_BATCH_MAX_FRAMES = int(os.getenv("CAMERA_BATCH_MAX_FRAMES", "10"))
+
+
+def _image_key(image_base64):
+    """
+    Compute a cache key for a camera frame
+    
+    Uses a 32x32 grayscale average hash so that near-identical frames share a
+    key. Falls back to hashing the raw base64 payload when Pillow is missing or
+    the image can't be decoded.
+    
+    Args:
+        image_base64: Base64 encoded image string (with or without data URL prefix)
+    
+    Returns:
+        16-byte digest
+    """
+    if image_base64.startswith("data:"):
+        image_base64 = image_base64.split(",", 1)[1]
+    
+    if Image is not None:
+        try:
+            with Image.open(io.BytesIO(base64.b64decode(image_base64))) as img:
+                pixels = img.convert("L").resize((32, 32)).tobytes()
+            mean = sum(pixels) / len(pixels)
+            bits = bytes(p > mean for p in pixels)
+            return hashlib.blake2b(bits, digest_size=16).digest()
+        except Exception:
+            pass
+    
+    return hashlib.blake2b(image_base64.encode(), digest_size=16).digest()
+
+
+def _loads_model_json(text):
+    """
+    Parse JSON returned by a model, tolerating a markdown code fence
+    
+    Raises:
+        orjson.JSONDecodeError: If the text isn't valid JSON
+    """
+    # Some models wrap JSON in a markdown code fence even in JSON mode
+    json_text = text.strip()
+    if json_text.startswith("```"):
+        json_text = json_text.strip("`")
+        if json_text.lower().startswith("json"):
+            json_text = json_text[4:]
+    return orjson.loads(json_text)
+
+
+def _is_yes(value):
+    """Interpret a yes/no style answer from a model (bool or string)"""
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    return "yes" in value or "true" in value
+
+
+def analyze_screen_combined(assistant, image_base64, vision_model):
+    """
+    Extract text and classify activity with a single structured vision call
+    
+    Returns:
+        Dict with the screen analysis fields, or None if the call failed or the
+        model didn't return usable JSON (caller should use the two-step path)
+    """
+    print(f"[INFO] Analyzing screen (text + activity) using vision model: {vision_model}")
+    try:
+        analysis_result = assistant.llm_client.analyze_image(
+            image_base64=image_base64,
+            prompt=_SCREEN_COMBINED_PROMPT,
+            model=vision_model,
+            temperature=0.1,  # Low temperature for accurate OCR and consistent analysis
+            max_tokens=3000,
+            response_format={"type": "json_object"}
+        )
+    except Exception as e:
+        print(f"[WARN] Combined screen analysis failed: {str(e)}. Falling back to two-step analysis")
+        return None
+    
+    analysis_text = analysis_result.get("content", "") or ""
+    
+    try:
+        parsed = _loads_model_json(analysis_text)
+    except orjson.JSONDecodeError:
+        print("[WARN] Combined screen analysis returned invalid JSON. Falling back to two-step analysis")
+        return None
+    
+    if not isinstance(parsed, dict) or not str(parsed.get("activity") or "").strip():
+        print("[WARN] Combined screen analysis missing activity. Falling back to two-step analysis")
+        return None
+    
+    model_used = analysis_result.get("model_used", vision_model)
+    return {
+        "text_extracted": str(parsed.get("text") or "").strip(),
+        "activity_detected": str(parsed["activity"]).strip(),
+        "is_studying": _is_yes(parsed.get("is_studying", True)),
+        "details": str(parsed.get("details") or "").strip(),
+        "analysis": analysis_text,
+        "ocr_model_used": model_used,
+        "vision_model_used": model_used
+    }
+
+
+def analyze_screen_two_step(assistant, image_base64, vision_model):
+    """
+    Extract text with the OCR model, then classify activity with the vision model
+    
+    Returns:
+        Dict with the screen analysis fields
+    """
+    # Step 1: Extract text using OCR model (specialized for text extraction)
+    # Note: Using gpt-4-turbo as default OCR model since it's reliable for text extraction
+    # Alternative: google/gemini-1.5-pro or google/gemini-1.5-flash (if available)
+    ocr_model = os.getenv("OPENROUTER_OCR_MODEL", "openai/gpt-4-turbo")
+    
+    # Validate OCR model name (prevent common mistakes)
+    if "gemini-pro-vision" in ocr_model.lower():
+        print(f"[WARN] Invalid OCR model '{ocr_model}' detected. Using default 'openai/gpt-4-turbo' instead.")
+        ocr_model = "openai/gpt-4-turbo"
+    
+    print(f"[INFO] Extracting text using OCR model: {ocr_model}")
+    ocr_result = assistant.llm_client.analyze_image(
+        image_base64=image_base64,
+        prompt=_SCREEN_OCR_PROMPT,
+        model=ocr_model,
+        temperature=0.1,  # Very low temperature for accurate OCR
+        max_tokens=2000,
+        use_backup=False  # OCR should be precise, don't use backup
+    )
+    text_extracted = ocr_result.get("content", "").strip()
+    ocr_model_used = ocr_result.get("model_used", ocr_model)
+    
+    # Step 2: Analyze activity using vision model (for context understanding)
+    activity_prompt = _SCREEN_ACTIVITY_PROMPT.format(text_extracted=text_extracted)
+    
+    print(f"[INFO] Analyzing activity using vision model: {vision_model}")
+    analysis_result = assistant.llm_client.analyze_image(
+        image_base64=image_base64,
+        prompt=activity_prompt,
+        model=vision_model,
+        temperature=0.3,  # Lower temperature for more consistent analysis
+        max_tokens=1000
+    )
+    
+    analysis_text = analysis_result.get("content", "")
+    
+    # Parse the activity analysis to extract structured information
+    # Note: text_extracted is already set from OCR step above
+    is_studying = True
+    # Multi-line values are collected per section and joined once at the end
+    buffers = {"activity": [], "details": []}
+    
+    # Try to parse the structured response from activity analysis
+    lines = analysis_text.split("\n")
+    current_section = None
+    
+    for line in lines:
+        line = line.strip()
+        if line.startswith("ACTIVITY:"):
+            buffers["activity"] = [line.replace("ACTIVITY:", "").strip()]
+            current_section = "activity"
+        elif line.startswith("IS_STUDYING:"):
+            is_studying_str = line.replace("IS_STUDYING:", "").strip().lower()
+            is_studying = "yes" in is_studying_str or "true" in is_studying_str
+            current_section = "studying"
+        elif line.startswith("DETAILS:"):
+            buffers["details"] = [line.replace("DETAILS:", "").strip()]
+            current_section = "details"
+        elif line and current_section in buffers:
+            # Continue appending to current section
+            buffers[current_section].append(line)
+    
+    activity_detected = " ".join(buffers["activity"]).strip()
+    details = " ".join(buffers["details"]).strip()
+    
+    # If parsing didn't work well, use fallback detection
+    if not activity_detected:
+        activity_detected = "Unable to parse activity"
+        # Try to detect keywords from analysis
+        if _SCREEN_NON_STUDY_RE.search(analysis_text):
+            is_studying = False
+            activity_detected = "Non-study activity detected"
+        elif _SCREEN_STUDY_RE.search(analysis_text):
+            is_studying = True
+            activity_detected = "Study activity detected"
+    
+    return {
+        "text_extracted": text_extracted,
+        "activity_detected": activity_detected,
+        "is_studying": is_studying,
+        "details": details,
+        "analysis": analysis_text,
+        "ocr_model_used": ocr_model_used,
+        "vision_model_used": analysis_result.get("model_used", vision_model)
+    }
+
+
+@app.route('/detectscreen', methods=['POST'])
+def detect_screen():
+    """
+    Analyze a screenshot to extract text and detect non-study activities
+    
+    Expected JSON payload:
+    {
+        "image": "base64_encoded_image_string" or "data:image/jpeg;base64,..."
+    }
+    
+    Returns:
+    {
+        "text_extracted": "extracted text from image",
+        "activity_detected": "description of what user is doing",
+        "is_studying": true/false,
+        "analysis": "full AI analysis",
+        "warning_message": "...",  # only when not studying
+        "audio_pending_id": "...",  # only when not studying; fetch via GET /audio/<id>
+        "status": "success"
+    }
+    """
+    # Get the shared assistant (initialized on first use)
+    try:
+        assistant = get_assistant()
+    except Exception as e:
+        return jsonify({
+            "error": f"Failed to initialize assistant: {str(e)}",
+            "status": "error"
+        }), 500
+    elevenlabs_client = get_elevenlabs()
+    
+    # Get image from request
+    data = get_request_json()
+    
+    if not data:
+        return jsonify({
+            "error": "No JSON data provided",
+            "status": "error"
+        }), 400
+    
+    image_base64 = data.get('image', '').strip()
+    
+    if not image_base64:
+        return jsonify({
+            "error": "Image field is required and cannot be empty",
+            "status": "error"
+        }), 400
+    
+    vision_model = os.getenv("OPENROUTER_VISION_MODEL", "openai/gpt-4-turbo")
+    
+    # Extract text and classify the activity in a single multimodal call;
+    # only fall back to separate OCR + activity calls if that fails
+    analysis = analyze_screen_combined(assistant, image_base64, vision_model)
+    if analysis is None:
+        analysis = analyze_screen_two_step(assistant, image_base64, vision_model)
+    
+    text_extracted = analysis["text_extracted"]
+    activity_detected = analysis["activity_detected"]
+    is_studying = analysis["is_studying"]
+    details = analysis["details"]
+    
+    # Return structured response
+    result = {
+        "text_extracted": text_extracted,
+        "activity_detected": activity_detected,
+        "is_studying": is_studying,
+        "analysis": analysis["analysis"],
+        "ocr_model_used": analysis["ocr_model_used"],
+        "vision_model_used": analysis["vision_model_used"],
+        "status": "success"
+    }
+    
+    if details:
+        result["details"] = details
+    
+    # Generate warning audio in the background if user is not studying
+    if not is_studying and elevenlabs_client and activity_detected:
+        warning_message = f"Hey! Looks like you are doing {activity_detected}, you should be focusing!"
+        result["warning_message"] = warning_message
+        result["audio_pending_id"] = queue_warning_audio(elevenlabs_client, warning_message)
+    
+    return json_response(result)
+
+
+@app.route('/detectcamera', methods=['POST'])
+def detect_camera():
+    """
+    Analyze a camera image to detect person presence and study activity
+    
+    Expected JSON payload:
+    {
+        "image": "base64_encoded_image_string" or "data:image/jpeg;base64,..."
+    }
+    
+    Returns:
+    {
+        "person_present": true/false,
+        "activity_detected": "description of what user is doing",
+        "is_studying": true/false,
+        "analysis": "full AI analysis",
+        "warning_message": "...",  # only when not studying
+        "audio_pending_id": "...",  # only when not studying; fetch via GET /audio/<id>
+        "status": "success"
+    }
+    """
+    # Get the shared assistant (initialized on first use)
+    try:
+        assistant = get_assistant()
+    except Exception as e:
+        return jsonify({
+            "error": f"Failed to initialize assistant: {str(e)}",
+            "status": "error"
+        }), 500
+    elevenlabs_client = get_elevenlabs()
+    
+    # Get image from request
+    data = get_request_json()
+    
+    if not data:
+        return jsonify({
+            "error": "No JSON data provided",
+            "status": "error"
+        }), 400
+    
+    image_base64 = data.get('image', '').strip()
+    
+    if not image_base64:
+        return jsonify({
+            "error": "Image field is required and cannot be empty",
+            "status": "error"
+        }), 400
+    
+    # Analyze camera image using vision model
+    vision_model = os.getenv("OPENROUTER_VISION_MODEL", "openai/gpt-4-turbo")
+    
+    cache_key = (vision_model, _image_key(image_base64))
+    with _vision_cache_lock:
+        analysis_result = _vision_cache.get(cache_key)
+    
+    if analysis_result is not None:
+        print(f"[INFO] Reusing cached camera analysis ({vision_model})")
+    else:
         print(f"[INFO] Analyzing camera image using vision model: {vision_model}")
         analysis_result = assistant.llm_client.analyze_image(
             image_base64=image_base64,
-            prompt=camera_prompt,
+            prompt=_CAMERA_PROMPT,
             model=vision_model,
             temperature=0.3,  # Lower temperature for more consistent analysis
             max_tokens=1000
         )
-        
-        analysis_text = analysis_result.get("content", "")
-        
-        # Parse the analysis to extract structured information
-        person_present = False
-        activity_detected = ""
-        is_studying = False
-        details = ""
-        
-        # Try to parse the structured response
-        lines = analysis_text.split("\n")
-        current_section = None
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith("PERSON_PRESENT:"):
-                person_present_str = line.replace("PERSON_PRESENT:", "").strip().lower()
-                person_present = "yes" in person_present_str or "true" in person_present_str
-                current_section = "presence"
-            elif line.startswith("ACTIVITY:"):
-                activity_detected = line.replace("ACTIVITY:", "").strip()
-                current_section = "activity"
-            elif line.startswith("IS_STUDYING:"):
-                is_studying_str = line.replace("IS_STUDYING:", "").strip().lower()
-                is_studying = "yes" in is_studying_str or "true" in is_studying_str
-                current_section = "studying"
-            elif line.startswith("DETAILS:"):
-                details = line.replace("DETAILS:", "").strip()
-                current_section = "details"
-            elif line and current_section:
-                # Continue appending to current section
-                if current_section == "activity":
-                    activity_detected += " " + line
-                elif current_section == "details":
-                    details += " " + line
-        
-        # If parsing didn't work well, use fallback detection
-        if not activity_detected:
-            activity_detected = "Unable to parse activity"
-            # Try to detect keywords from analysis
-            analysis_lower = analysis_text.lower()
-            
-            # Check for person presence keywords
-            if any(keyword in analysis_lower for keyword in ["no person", "absent", "not visible", "empty", "no one"]):
-                person_present = False
+        with _vision_cache_lock:
+            _vision_cache[cache_key] = analysis_result
+    
+    analysis_text = analysis_result.get("content", "")
+    
+    # Parse the structured response in one pass. ACTIVITY/DETAILS may wrap onto
+    # several lines (joined with spaces); the yes/no verdicts only use their own
+    # line so a wrapped explanation can't flip them
+    fields = {}
+    for match in _CAMERA_FIELD_RE.finditer(analysis_text):
+        key, value = match["key"], match["val"]
+        if key in ("PERSON_PRESENT", "IS_STUDYING"):
+            fields[key] = value.split("\n", 1)[0].strip()
+        else:
+            value_lines = (line.strip() for line in value.splitlines())
+            fields[key] = " ".join(line for line in value_lines if line)
+    
+    person_present = _is_yes(fields.get("PERSON_PRESENT", ""))
+    activity_detected = fields.get("ACTIVITY", "")
+    is_studying = _is_yes(fields.get("IS_STUDYING", ""))
+    details = fields.get("DETAILS", "")
+    
+    # If parsing didn't work well, use fallback detection
+    if not activity_detected:
+        activity_detected = "Unable to parse activity"
+        # Check for person presence keywords
+        if _CAMERA_ABSENCE_RE.search(analysis_text):
+            person_present = False
+            is_studying = False
+            activity_detected = "No person detected in camera"
+        elif _CAMERA_PRESENCE_RE.search(analysis_text):
+            person_present = True
+            # Check for distractions
+            if _CAMERA_DISTRACTION_RE.search(analysis_text):
                 is_studying = False
-                activity_detected = "No person detected in camera"
-            elif any(keyword in analysis_lower for keyword in ["person", "visible", "present", "seen"]):
-                person_present = True
-                # Check for distractions
-                distraction_keywords = ["phone", "mobile", "tablet", "device", "looking away", "distracted", "eating", "drinking", "sleeping"]
-                if any(keyword in analysis_lower for keyword in distraction_keywords):
-                    is_studying = False
-                    activity_detected = "Person present but distracted"
-                else:
-                    is_studying = True
-                    activity_detected = "Person present and studying"
-        
+                activity_detected = "Person present but distracted"
+            else:
+                is_studying = True
+                activity_detected = "Person present and studying"
+    
+    # Enforce critical rules: if no person present, definitely not studying
+    if not person_present:
+        is_studying = False
+        if not activity_detected or activity_detected == "Unable to parse activity":
+            activity_detected = "No person detected in camera"
+    
+    # Return structured response
+    result = {
+        "person_present": person_present,
+        "activity_detected": activity_detected,
+        "is_studying": is_studying,
+        "analysis": analysis_text,
+        "vision_model_used": analysis_result.get("model_used", vision_model),
+        "status": "success"
+    }
+    
+    if details:
+        result["details"] = details
+    
+    # Generate warning audio in the background if user is not studying
+    if not is_studying and elevenlabs_client and activity_detected:
+        warning_message = f"Hey! Looks like you are doing {activity_detected}, you should be focusing!"
+        result["warning_message"] = warning_message
+        result["audio_pending_id"] = queue_warning_audio(elevenlabs_client, warning_message)
+    
+    return json_response(result)
+
+
+@app.route('/detectcamera/batch', methods=['POST'])
+def detect_camera_batch():
+    """
+    Analyze several camera frames with a single vision model call
+    
+    Expected JSON payload:
+    {
+        "images": ["base64_encoded_image_string" or "data:image/jpeg;base64,...", ...]
+    }
+    
+    Returns:
+    {
+        "frames": [
+            {
+                "person_present": true/false,
+                "activity_detected": "description of what user is doing",
+                "is_studying": true/false,
+                "details": "..."
+            },
+            ...
+        ],
+        "analysis": "full AI analysis",
+        "vision_model_used": "model name",
+        "warning_message": "...",  # only when the latest frame is not studying
+        "audio_pending_id": "...",  # only when the latest frame is not studying
+        "status": "success"
+    }
+    """
+    # Get the shared assistant (initialized on first use)
+    try:
+        assistant = get_assistant()
+    except Exception as e:
+        return jsonify({
+            "error": f"Failed to initialize assistant: {str(e)}",
+            "status": "error"
+        }), 500
+    elevenlabs_client = get_elevenlabs()
+    
+    # Get images from request
+    data = get_request_json()
+    
+    if not data:
+        return jsonify({
+            "error": "No JSON data provided",
+            "status": "error"
+        }), 400
+    
+    images = data.get('images')
+    
+    if not isinstance(images, list) or not images or not all(isinstance(img, str) and img.strip() for img in images):
+        return jsonify({
+            "error": "Images field is required and must be a non-empty list of base64 strings",
+            "status": "error"
+        }), 400
+    
+    if len(images) > CAMERA_BATCH_MAX_FRAMES:
+        return jsonify({
+            "error": f"Too many images (max {CAMERA_BATCH_MAX_FRAMES} per batch)",
+            "status": "error"
+        }), 400
+    
+    # Analyze all frames in one vision model call
+    vision_model = os.getenv("OPENROUTER_VISION_MODEL", "openai/gpt-4-turbo")
+    print(f"[INFO] Analyzing {len(images)} camera frames using vision model: {vision_model}")
+    analysis_result = assistant.llm_client.analyze_images(
+        images_base64=[img.strip() for img in images],
+        prompt=_CAMERA_BATCH_PROMPT.format(count=len(images)),
+        model=vision_model,
+        temperature=0.3,  # Lower temperature for more consistent analysis
+        max_tokens=300 * len(images),
+        response_format={"type": "json_object"}
+    )
+    
+    analysis_text = analysis_result.get("content", "") or ""
+    
+    try:
+        parsed = _loads_model_json(analysis_text)
+    except orjson.JSONDecodeError:
+        parsed = None
+    
+    frames = parsed.get("frames") if isinstance(parsed, dict) else None
+    if not isinstance(frames, list) or len(frames) != len(images):
+        return jsonify({
+            "error": "Vision model returned an unexpected batch analysis",
+            "analysis": analysis_text,
+            "status": "error"
+        }), 500
+    
+    verdicts = []
+    for frame in frames:
+        if not isinstance(frame, dict):
+            frame = {}
+        person_present = _is_yes(frame.get("person_present", False))
+        activity_detected = str(frame.get("activity") or "").strip()
         # Enforce critical rules: if no person present, definitely not studying
-        if not person_present:
-            is_studying = False
-            if not activity_detected or activity_detected == "Unable to parse activity":
-                activity_detected = "No person detected in camera"
+        is_studying = person_present and _is_yes(frame.get("is_studying", False))
+        if not person_present and not activity_detected:
+            activity_detected = "No person detected in camera"
         
-        # Return structured response
-        result = {
+        verdict = {
             "person_present": person_present,
-            "activity_detected": activity_detected,
-            "is_studying": is_studying,
-            "analysis": analysis_text,
-            "vision_model_used": analysis_result.get("model_used", vision_model),
-            "status": "success"
+            "activity_detected": activity_detected or "Unable to parse activity",
+            "is_studying": is_studying
         }
-        
+        details = str(frame.get("details") or "").strip()
         if details:
-            result["details"] = details
-        
-        # Generate warning audio if user is not studying
-        if not is_studying and elevenlabs_client and activity_detected:
-            try:
-                # Create warning message
-                warning_message = f"Hey! Looks like you are doing {activity_detected}, you should be focusing!"
-                
-                # Generate audio from warning message
-                audio_result = elevenlabs_client.text_to_speech(
-                    text=warning_message,
-                    stability=0.5,
-                    similarity_boost=0.75,
-                    style=0.2,
-                    use_speaker_boost=True
-                )
-                
-                audio_data = {
-                    "data": audio_result["audio_base64"],
-                    "format": audio_result["format"],
-                    "data_url": f"data:audio/{audio_result['format']};base64,{audio_result['audio_base64']}"
-                }
-                result["audio"] = audio_data
-                result["warning_message"] = warning_message
-                
-                # Save audio file for debugging (backend only)
-                try:
-                    saved_path = elevenlabs_client.save_audio(
-                        audio_data=audio_result.get("audio_data"),
-                        text=warning_message,
-                        output_dir="audio_output"
-                    )
-                    print(f"Saved warning audio: {saved_path}")
-                except Exception as save_error:
-                    print(f"Failed to save warning audio: {str(save_error)}")
-            except Exception as e:
-                # If audio generation fails, still return text response
-                print(f"Failed to generate warning audio: {str(e)}")
-        
-        return jsonify(result), 200
+            verdict["details"] = details
+        verdicts.append(verdict)
     
-    except Exception as e:
+    result = {
+        "frames": verdicts,
+        "analysis": analysis_text,
+        "vision_model_used": analysis_result.get("model_used", vision_model),
+        "status": "success"
+    }
+    
+    # Warn based on the most recent frame only
+    latest = verdicts[-1]
+    if not latest["is_studying"] and elevenlabs_client:
+        warning_message = f"Hey! Looks like you are doing {latest['activity_detected']}, you should be focusing!"
+        result["warning_message"] = warning_message
+        result["audio_pending_id"] = queue_warning_audio(elevenlabs_client, warning_message)
+    
+    return json_response(result)
+
+
+@app.route('/audio/<audio_id>', methods=['GET'])
+def get_audio(audio_id):
+    """
+    Fetch warning audio queued by /detectscreen or /detectcamera
+    
+    Returns:
+    202 while generation is still running, then the raw MP3 bytes (audio/mpeg)
+    """
+    with _tts_cache_lock:
+        entry = _tts_cache.get(audio_id)
+    
+    if entry is None:
         return jsonify({
-            "error": f"Error processing camera detection: {str(e)}",
+            "error": "Unknown or expired audio id",
+            "status": "error"
+        }), 404
+    
+    if entry["status"] == "pending":
+        return jsonify({"status": "pending"}), 202
+    
+    if entry["status"] == "error":
+        return jsonify({
+            "error": entry["error"],
             "status": "error"
         }), 500
+    
+    return Response(entry["audio"], mimetype='audio/mpeg')
 
 
 @app.route('/status', methods=['GET'])
@@ -1136,9 +1630,7 @@ def status():
         "status": "success"
     }
     """
-    global assistant
-    
-    if assistant is None:
+    if not assistant_initialized():
         return jsonify({
             "is_active": False,
             "model": None,
@@ -1146,6 +1638,7 @@ def status():
             "status": "not_initialized"
         }), 200
     
+    assistant = get_assistant()
     return jsonify({
         "is_active": assistant.is_active,
         "model": assistant.llm_client.model,
@@ -1154,8 +1647,44 @@ def status():
     }), 200
 
 
-def run_api_server(port=5000, host='0.0.0.0'):
-    """Run the Flask API server"""
+def run_production_server(port=5000, host='0.0.0.0'):
+    """
+    Run the API under Gunicorn using gunicorn.conf.py
+    
+    Workers warm themselves up in the config's post_fork hook, so nothing is
+    initialized in this (parent) process. Runs a single threaded worker unless
+    WEB_CONCURRENCY says otherwise.
+    
+    Returns:
+        Gunicorn's exit code
+    """
+    if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+        print("[WARN] WEB_CONCURRENCY > 1: each worker keeps its own conversation, "
+              "welcome message and audio store; use GUNICORN_THREADS to scale instead")
+    
+    ml_dir = os.path.dirname(os.path.abspath(__file__))
+    command = [
+        sys.executable, '-m', 'gunicorn',
+        '-c', os.path.join(ml_dir, 'gunicorn.conf.py'),
+        '-b', f'{host}:{port}',
+        'api_server:app'
+    ]
+    print(f"Starting Gunicorn on http://{host}:{port}")
+    try:
+        return subprocess.run(command, cwd=ml_dir).returncode
+    except KeyboardInterrupt:
+        return 0
+
+
+def run_api_server(port=5000, host='0.0.0.0', debug=False):
+    """
+    Run the Flask API server
+    
+    Args:
+        port: Port to listen on
+        host: Host to bind to
+        debug: Enable the Werkzeug debugger and reloader (development only)
+    """
     # Initialize assistant on startup
     try:
         print("=" * 50)
@@ -1163,13 +1692,18 @@ def run_api_server(port=5000, host='0.0.0.0'):
         print("=" * 50)
         init_assistant()
         print("Assistant initialized successfully")
-        if elevenlabs_client:
+        if get_elevenlabs():
             print("ElevenLabs audio generation enabled")
         print("=" * 50)
         print("API Endpoints:")
         print("  GET  /welcome - Get welcome message with audio")
         print("  POST /chat - Send user message and get response (with audio)")
+        print("  POST /voice - Send base64 audio, transcribe it and get response (with audio)")
+        print("  POST /voice/binary - Same as /voice with raw audio bytes as the request body")
         print("  POST /detectscreen - Analyze screenshot for text extraction and activity detection")
+        print("  POST /detectcamera - Analyze camera image for presence and study activity")
+        print("  POST /detectcamera/batch - Analyze several camera frames in one model call")
+        print("  GET  /audio/<id> - Fetch warning audio queued by the detect endpoints")
         print("  POST /reset - Reset conversation history")
         print("  GET  /status - Get assistant status")
         print("  GET  /health - Health check")
@@ -1180,8 +1714,8 @@ def run_api_server(port=5000, host='0.0.0.0'):
         print(f"Failed to initialize assistant: {str(e)}")
         print("Server will start but assistant may not be available")
     
-    # Run Flask server
-    app.run(host=host, port=port, debug=True)
+    # Run Flask server (threaded so slow model calls don't block other requests)
+    app.run(host=host, port=port, debug=debug, threaded=True)
 
 
 if __name__ == '__main__':
@@ -1205,12 +1739,26 @@ if __name__ == '__main__':
         default='0.0.0.0',
         help='Host for API server (default: 0.0.0.0)'
     )
+    server_mode = parser.add_mutually_exclusive_group()
+    server_mode.add_argument(
+        '--production',
+        action='store_true',
+        help='Run the API server under Gunicorn with gunicorn.conf.py (Linux/macOS)'
+    )
+    server_mode.add_argument(
+        '--dev',
+        action='store_true',
+        help='Run the Flask development server with the debugger and auto-reloader'
+    )
     
     args = parser.parse_args()
     
     if args.cli:
         # Run in CLI mode
         run_cli_mode()
+    elif args.production:
+        # Run API server under Gunicorn
+        sys.exit(run_production_server(port=args.port, host=args.host))
     else:
         # Run API server (default)
-        run_api_server(port=args.port, host=args.host)
+        run_api_server(port=args.port, host=args.host, debug=args.dev)
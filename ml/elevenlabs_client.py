@@ -2,26 +2,70 @@
 ElevenLabs API Client for Text-to-Speech
 """
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
-import base64
+import string
+import atexit
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict
 from datetime import datetime
 import hashlib
 
+# Prefer the SIMD-accelerated pybase64 for the (large) audio payloads
+try:
+    from pybase64 import b64decode, b64encode_as_string
+except ImportError:
+    from base64 import b64decode, b64encode
+
+    def b64encode_as_string(s: bytes) -> str:
+        return b64encode(s).decode('ascii')
+
+# Write-behind queue for debug audio files so callers never block on disk I/O;
+# drained on exit so queued files are not lost
+_disk_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='pika-disk')
+atexit.register(_disk_executor.shutdown, wait=True)
+
+# Filename sanitizing: delete every ASCII char except letters, digits, space, - and _
+# (non-ASCII is dropped separately before translating)
+_SAFE_FILENAME_CHARS = set(string.ascii_letters + string.digits + ' -_')
+_SANITIZE_TABLE = str.maketrans({chr(i): None for i in range(128) if chr(i) not in _SAFE_FILENAME_CHARS})
+
+# Output directories already created by save_audio (skips a makedirs per file)
+_ensured_dirs = set()
+
+
+def _write_file_bytes(filepath: str, data: bytes):
+    """Write bytes to a file (runs on the disk executor)"""
+    try:
+        with open(filepath, 'wb') as f:
+            f.write(data)
+    except OSError as e:
+        print(f"[WARN] Failed to write audio file {filepath}: {str(e)}")
+
 
 class ElevenLabsClient:
     """Client for interacting with ElevenLabs Text-to-Speech API"""
     
-    def __init__(self, api_key: Optional[str] = None, voice_id: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        voice_id: Optional[str] = None,
+        model_id: Optional[str] = None
+    ):
         """
         Initialize ElevenLabs client
         
         Args:
             api_key: ElevenLabs API key (defaults to ELEVENLABS_API_KEY env var)
             voice_id: Voice ID to use (defaults to ELEVENLABS_VOICE_ID env var or default voice)
+            model_id: TTS model to use (defaults to ELEVENLABS_MODEL env var or eleven_flash_v2_5)
         """
         self.api_key = api_key or os.getenv("ELEVENLABS_API_KEY")
         self.voice_id = voice_id or os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")  # Default: Rachel voice
+        # Flash model has the lowest first-byte latency, which matters for live replies
+        self.model_id = model_id or os.getenv("ELEVENLABS_MODEL", "eleven_flash_v2_5")
         
         if not self.api_key:
             raise ValueError("ElevenLabs API key is required. Set ELEVENLABS_API_KEY environment variable or pass api_key parameter.")
@@ -32,6 +76,25 @@ class ElevenLabsClient:
             "Content-Type": "application/json",
             "xi-api-key": self.api_key
         }
+        
+        # Persistent session so warnings/replies reuse the TLS connection instead of
+        # paying a fresh handshake per call. Only the API key is shared; Accept and
+        # Content-Type are set per call (STT sends multipart form data).
+        self._session = requests.Session()
+        self._session.headers.update({"xi-api-key": self.api_key})
+        retries = Retry(
+            total=2,
+            backoff_factor=0.2,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset({"GET", "POST"}),
+            raise_on_status=False  # Hand the final error response back for reporting
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries)
+        self._session.mount("https://", adapter)
+        
+        # Warning phrases come from a small vocabulary, so callers can opt in to
+        # memoized audio (cache=True); one-off replies bypass it
+        self._synthesize_cached = functools.lru_cache(maxsize=32)(self._synthesize)
     
     def text_to_speech(
         self,
@@ -40,7 +103,10 @@ class ElevenLabsClient:
         stability: float = 0.5,
         similarity_boost: float = 0.75,
         style: float = 0.0,
-        use_speaker_boost: bool = True
+        use_speaker_boost: bool = True,
+        model_id: Optional[str] = None,
+        return_base64: bool = True,
+        cache: bool = False
     ) -> Dict:
         """
         Convert text to speech using ElevenLabs API
@@ -52,22 +118,61 @@ class ElevenLabsClient:
             similarity_boost: Similarity boost (0.0-1.0)
             style: Style setting (0.0-1.0)
             use_speaker_boost: Whether to use speaker boost
+            model_id: TTS model to use (overrides default)
+            return_base64: If False, skip base64 encoding (for callers that serve raw bytes)
+            cache: If True, reuse audio memoized for the same text and settings
+                   (for short phrases that repeat, like warnings)
         
         Returns:
-            Dict with "audio_base64" (base64 encoded audio) and "format" (audio format)
+            Dict with "audio_data" (raw audio), "audio_base64" (base64 encoded audio, if
+            requested) and "format" (audio format)
         """
         if not text or not text.strip():
             raise ValueError("Text cannot be empty")
         
-        # Use provided voice_id or default
-        voice = voice_id or self.voice_id
+        synthesize = self._synthesize_cached if cache else self._synthesize
+        audio_data = synthesize(
+            text,
+            voice_id or self.voice_id,
+            stability,
+            similarity_boost,
+            style,
+            use_speaker_boost,
+            model_id or self.model_id
+        )
+        
+        result = {
+            "audio_data": audio_data,  # Raw binary data for saving/serving
+            "format": "mp3",
+            "size_bytes": len(audio_data)
+        }
+        if return_base64:
+            # Convert to base64 for JSON response
+            result["audio_base64"] = b64encode_as_string(audio_data)
+        return result
+    
+    def _synthesize(
+        self,
+        text: str,
+        voice: str,
+        stability: float,
+        similarity_boost: float,
+        style: float,
+        use_speaker_boost: bool,
+        model_id: str
+    ) -> bytes:
+        """
+        Call the ElevenLabs TTS endpoint (memoized per instance when cache=True)
         
+        Returns:
+            Raw audio bytes
+        """
         # Prepare request
         url = f"{self.base_url}/text-to-speech/{voice}"
         
         payload = {
             "text": text,
-            "model_id": "eleven_monolingual_v1",
+            "model_id": model_id,
             "voice_settings": {
                 "stability": stability,
                 "similarity_boost": similarity_boost,
@@ -77,7 +182,7 @@ class ElevenLabsClient:
         }
         
         try:
-            response = requests.post(
+            response = self._session.post(
                 url,
                 headers=self.headers,
                 json=payload,
@@ -85,18 +190,7 @@ class ElevenLabsClient:
             )
             response.raise_for_status()
             
-            # Get audio data
-            audio_data = response.content
-            
-            # Convert to base64 for JSON response
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-            
-            return {
-                "audio_base64": audio_base64,
-                "audio_data": audio_data,  # Raw binary data for saving
-                "format": "mp3",
-                "size_bytes": len(audio_data)
-            }
+            return response.content
         
         except requests.exceptions.RequestException as e:
             raise Exception(f"ElevenLabs API error: {str(e)}")
@@ -109,9 +203,8 @@ class ElevenLabsClient:
             List of voice dictionaries
         """
         try:
-            response = requests.get(
+            response = self._session.get(
                 f"{self.base_url}/voices",
-                headers={"xi-api-key": self.api_key},
                 timeout=30
             )
             response.raise_for_status()
@@ -138,7 +231,23 @@ class ElevenLabsClient:
             raise ValueError("Audio data cannot be empty")
         
         # Decode base64 to bytes
-        audio_bytes = base64.b64decode(audio_base64)
+        audio_bytes = b64decode(audio_base64, validate=False)
+        
+        return self.speech_to_text_bytes(audio_bytes, audio_format, model_id)
+    
+    def speech_to_text_bytes(self, audio_bytes: bytes, audio_format: str = "audio/webm", model_id: str = "scribe_v1") -> str:
+        """
+        Convert raw audio bytes to text using ElevenLabs Audio Transcriptions API
+        
+        Args:
+            audio_bytes: Raw audio data
+            audio_format: MIME type of the audio (e.g., "audio/webm", "audio/mpeg")
+        
+        Returns:
+            Transcribed text string
+        """
+        if not audio_bytes:
+            raise ValueError("Audio data cannot be empty")
         
         # ElevenLabs Speech-to-Text endpoint
         url = f"{self.base_url}/speech-to-text"
@@ -153,12 +262,11 @@ class ElevenLabsClient:
         }
         
         headers = {
-            "xi-api-key": self.api_key,
             "Accept": "application/json"
         }
         
         try:
-            response = requests.post(
+            response = self._session.post(
                 url,
                 headers=headers,
                 data=data,
@@ -216,6 +324,9 @@ class ElevenLabsClient:
         """
         Save audio data to a file for debugging/verification
         
+        The path is computed synchronously; the write itself is queued on a
+        background executor, so the file may not exist yet when this returns.
+        
         Args:
             audio_data: Raw binary audio data
             text: The text that was converted to speech (for filename)
@@ -228,23 +339,24 @@ class ElevenLabsClient:
         ml_dir = os.path.dirname(os.path.abspath(__file__))
         output_path = os.path.join(ml_dir, output_dir)
         
-        # Create output directory if it doesn't exist
-        os.makedirs(output_path, exist_ok=True)
+        # Create output directory if it doesn't exist (once per process)
+        if output_path not in _ensured_dirs:
+            os.makedirs(output_path, exist_ok=True)
+            _ensured_dirs.add(output_path)
         
         # Generate filename: timestamp + text hash (first 8 chars) + .mp3
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        text_hash = hashlib.md5(text.encode()).hexdigest()[:8]
+        text_hash = hashlib.blake2b(text.encode('utf-8'), digest_size=4).hexdigest()
         
         # Sanitize text for filename (first 30 chars, remove special chars)
-        text_snippet = "".join(c for c in text[:30] if c.isalnum() or c in (' ', '-', '_')).strip()
-        text_snippet = text_snippet.replace(' ', '_')
+        text_snippet = text[:30].encode('ascii', 'ignore').decode('ascii')
+        text_snippet = text_snippet.translate(_SANITIZE_TABLE).strip().replace(' ', '_')
         
         filename = f"{timestamp}_{text_hash}_{text_snippet}.mp3"
         filepath = os.path.join(output_path, filename)
         
-        # Save audio file
-        with open(filepath, 'wb') as f:
-            f.write(audio_data)
+        # Queue the write (write-behind)
+        _disk_executor.submit(_write_file_bytes, filepath, audio_data)
         
         return filepath
 
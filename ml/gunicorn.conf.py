@@ -0,0 +1,34 @@
+"""
+Gunicorn configuration for the API server
+Run from the ml/ directory: gunicorn -c gunicorn.conf.py api_server:app
+"""
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+# One process by default: the assistant (conversation history, welcome message)
+# and the in-memory caches are per process, so extra workers would each keep
+# their own copy. Scale with GUNICORN_THREADS instead; WEB_CONCURRENCY > 1
+# needs that state moved somewhere all workers share.
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+timeout = 120  # Vision model calls can take a while
+
+
+def post_fork(server, worker):
+    """
+    Warm up each worker before it accepts requests
+    
+    Initializes the assistant (OpenRouter), the ElevenLabs client and the welcome
+    audio cache so the first real user doesn't pay the cold-start latency.
+    """
+    from api_server import app, init_assistant, welcome
+    
+    try:
+        init_assistant()
+        with app.test_request_context('/welcome'):
+            welcome()
+        server.log.info(f"Worker {worker.pid} warmed up")
+    except Exception as e:
+        # The worker can still serve requests; initialization is retried lazily
+        server.log.warning(f"Worker {worker.pid} warmup failed: {str(e)}")
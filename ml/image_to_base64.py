@@ -3,10 +3,36 @@ Image to Base64 Converter Utility
 Simple tool for converting images to base64 format.
 NOT for production use.
 """
-import base64
+import os
 import sys
-import argparse
-from pathlib import Path
+import mmap
+
+# Prefer the SIMD-accelerated pybase64; fall back to the standard library
+try:
+    from pybase64 import b64encode_as_string
+except ImportError:
+    from base64 import b64encode
+
+    def b64encode_as_string(s: bytes) -> str:
+        return b64encode(s).decode('ascii')
+
+
+# MIME types for data URLs, keyed by lowercase file extension
+_MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+    '.bmp': 'image/bmp'
+}
+
+# Files up to this size are read in one shot; mapping them isn't worth the setup
+_MMAP_THRESHOLD = 1_000_000
+
+# Data URL prefixes built once per MIME type
+_DATA_URL_PREFIXES = {ext: f"data:{mime};base64," for ext, mime in _MIME_TYPES.items()}
+_DEFAULT_DATA_URL_PREFIX = "data:image/jpeg;base64,"
 
 
 def image_to_base64(image_path: str, data_url: bool = False) -> str:
@@ -21,36 +47,52 @@ def image_to_base64(image_path: str, data_url: bool = False) -> str:
     Returns:
         Base64 encoded string (raw or data URL format)
     """
-    image_path = Path(image_path)
-    
-    if not image_path.exists():
-        raise FileNotFoundError(f"Image file not found: {image_path}")
-    
-    # Read image file
-    with open(image_path, 'rb') as image_file:
-        image_data = image_file.read()
-    
-    # Encode to base64
-    base64_string = base64.b64encode(image_data).decode('utf-8')
+    # Large files are mapped and encoded straight from the page cache, so only
+    # the base64 output is held in memory; small ones are read with a single
+    # unbuffered read (open() raises FileNotFoundError for a missing path)
+    with open(image_path, 'rb', buffering=0) as image_file:
+        size = os.fstat(image_file.fileno()).st_size
+        if size <= _MMAP_THRESHOLD:
+            base64_string = b64encode_as_string(image_file.readall())
+        else:
+            with mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ) as image_data:
+                base64_string = b64encode_as_string(image_data)
     
     if data_url:
         # Determine MIME type from file extension
-        ext = image_path.suffix.lower()
-        mime_types = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.gif': 'image/gif',
-            '.webp': 'image/webp',
-            '.bmp': 'image/bmp'
-        }
-        mime_type = mime_types.get(ext, 'image/jpeg')
-        return f"data:{mime_type};base64,{base64_string}"
+        ext = os.path.splitext(image_path)[1].lower()
+        return _DATA_URL_PREFIXES.get(ext, _DEFAULT_DATA_URL_PREFIX) + base64_string
     
     return base64_string
 
 
-def main():
+def _parse_simple_args(argv):
+    """
+    Fast path for the common invocations (an image plus --data-url/--preview)
+    
+    Returns:
+        (image, data_url, preview) tuple, or None to fall back to argparse
+    """
+    image = None
+    data_url = preview = False
+    for arg in argv:
+        if arg == '--data-url':
+            data_url = True
+        elif arg == '--preview':
+            preview = True
+        elif arg.startswith('-') or image is not None:
+            return None  # --help, --output, or anything unusual
+        else:
+            image = arg
+    if image is None:
+        return None
+    return image, data_url, preview
+
+
+def _parse_args(argv):
+    """Full argument parsing (imports argparse only when needed)"""
+    import argparse
+    
     parser = argparse.ArgumentParser(
         description='Convert image to base64 string',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -78,23 +120,35 @@ Examples:
         help='Show first 100 characters of base64 string'
     )
     
-    args = parser.parse_args()
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    
+    simple = _parse_simple_args(argv)
+    if simple is not None:
+        image, data_url, preview = simple
+        output = None
+    else:
+        args = _parse_args(argv)
+        image, data_url, preview, output = args.image, args.data_url, args.preview, args.output
     
     try:
         # Convert image
-        base64_result = image_to_base64(args.image, data_url=args.data_url)
+        base64_result = image_to_base64(image, data_url=data_url)
         
         # Output result
-        if args.output:
-            output_path = Path(args.output)
-            with open(output_path, 'w') as f:
+        if output:
+            # Base64 is pure ASCII: skip newline translation and use a large buffer
+            with open(output, 'w', buffering=1 << 20, encoding='ascii', newline='') as f:
                 f.write(base64_result)
-            print(f"Base64 string saved to: {output_path}")
+            print(f"Base64 string saved to: {output}")
             print(f"Length: {len(base64_result)} characters")
         else:
-            if args.preview:
-                preview = base64_result[:100]
-                print(f"Base64 string (first 100 chars): {preview}...")
+            if preview:
+                preview_text = base64_result[:100]
+                print(f"Base64 string (first 100 chars): {preview_text}...")
                 print(f"Full length: {len(base64_result)} characters")
             else:
                 print(base64_result)
@@ -2,13 +2,53 @@
 OpenRouter API Client for LLM text generation with backup model support
 """
 import requests
+from requests.adapters import HTTPAdapter
 import os
+import re
+import orjson
 from typing import Optional, Dict, List
 
+# Backup models that can handle images (used to filter backups for vision calls)
+_VISION_MODEL_RE = re.compile(r'gpt-4|claude-3|gemini|vision', re.IGNORECASE)
+
+_401_DIAGNOSTIC = (
+    "\n[DIAGNOSTIC] 401 Unauthorized usually means:\n"
+    "  - API key is invalid or expired\n"
+    "  - API key doesn't have access to the requested model\n"
+    "  - Check your OpenRouter account at https://openrouter.ai/keys\n"
+)
+
+
+def _loads_response(response: requests.Response):
+    """
+    Parse a response body with orjson
+    
+    Malformed bodies raise a requests exception (as response.json() did), so
+    callers' RequestException handling - e.g. falling back to backup models -
+    still applies.
+    """
+    try:
+        return orjson.loads(response.content)
+    except orjson.JSONDecodeError as e:
+        raise requests.exceptions.InvalidJSONError(
+            f"Invalid JSON in response from OpenRouter: {str(e)}",
+            response=response
+        ) from e
+
+
+def _format_401_diagnostic(error_message: str) -> str:
+    """Append hints about common causes of a 401 to an OpenRouter error message"""
+    return f"{error_message}{_401_DIAGNOSTIC}"
+
 
 class OpenRouterClient:
     """Client for interacting with OpenRouter API with backup model support"""
     
+    __slots__ = (
+        "api_key", "model", "backup_models", "base_url", "headers",
+        "_session", "_text_models", "_vision_backups"
+    )
+    
     def __init__(
         self, 
         api_key: Optional[str] = None, 
@@ -29,6 +69,7 @@ class OpenRouterClient:
         
         self.model = model
         self.backup_models = backup_models or []
+        self._refresh_model_lists()
         self.base_url = "https://openrouter.ai/api/v1"
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -36,48 +77,69 @@ class OpenRouterClient:
             "HTTP-Referer": "https://github.com/yourusername/HackNYU2025",  # Optional: for tracking
             "X-Title": "Virtual AI Assistant"  # Optional: for tracking
         }
+        
+        # Persistent session so follow-up calls reuse the TLS connection
+        # (failed calls fall through to the backup models, so no retries here)
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
+        self._session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+    
+    @staticmethod
+    def _serialize_payload(payload: Dict) -> bytes:
+        """Serialize a request payload (without "model") to JSON bytes"""
+        return orjson.dumps(payload)
+    
+    def _refresh_model_lists(self):
+        """Rebuild the cached fallback orders after the model configuration changes"""
+        self._text_models = [self.model, *self.backup_models]
+        self._vision_backups = [m for m in self.backup_models if _VISION_MODEL_RE.search(m)]
     
     def _make_request(
         self,
         model: str,
         payload: Dict,
-        use_backup: bool = False
+        use_backup: bool = False,
+        body: Optional[bytes] = None
     ) -> Dict:
         """
         Make a request to OpenRouter API with a specific model
         
         Args:
             model: Model to use
-            payload: Request payload
+            payload: Request payload (without "model")
             use_backup: Whether this is a backup attempt
+            body: payload already serialized with _serialize_payload (avoids
+                  re-serializing large image payloads for every backup model)
         
         Returns:
             Response dict with content and tool_calls
         """
-        payload_copy = payload.copy()
-        payload_copy["model"] = model
+        if body is None:
+            body = self._serialize_payload(payload)
+        
+        # Splice the model in front of the serialized payload instead of copying
+        # and re-serializing the whole dict (the join is the only copy of body)
+        if body == b"{}":
+            data = b'{"model":' + orjson.dumps(model) + b"}"
+        else:
+            data = b"".join((b'{"model":', orjson.dumps(model), b",", memoryview(body)[1:]))
         
-        response = requests.post(
+        response = self._session.post(
             f"{self.base_url}/chat/completions",
-            headers=self.headers,
-            json=payload_copy,
+            data=data,
             timeout=60  # Increased timeout for vision models
         )
         
         # Better error handling to show actual error message
         if response.status_code != 200:
             try:
-                error_data = response.json()
+                error_data = orjson.loads(response.content)
                 error_message = error_data.get("error", {}).get("message", response.text)
                 error_type = error_data.get("error", {}).get("type", "unknown")
                 
                 # Provide helpful diagnostics for common errors
                 if response.status_code == 401:
-                    diagnostic = "\n[DIAGNOSTIC] 401 Unauthorized usually means:\n"
-                    diagnostic += "  - API key is invalid or expired\n"
-                    diagnostic += "  - API key doesn't have access to the requested model\n"
-                    diagnostic += "  - Check your OpenRouter account at https://openrouter.ai/keys\n"
-                    error_message = f"{error_message}{diagnostic}"
+                    error_message = _format_401_diagnostic(error_message)
                 
                 raise requests.exceptions.HTTPError(
                     f"{response.status_code} {response.reason}: {error_message}"
@@ -86,7 +148,7 @@ class OpenRouterClient:
                 # If we can't parse JSON, use standard error
                 response.raise_for_status()
         
-        result = response.json()
+        result = _loads_response(response)
         message = result["choices"][0]["message"]
         
         return {
@@ -137,9 +199,10 @@ class OpenRouterClient:
                 payload["tool_choice"] = "auto"
         
         # Try primary model first
-        models_to_try = [self.model]
-        if use_backup and self.backup_models:
-            models_to_try.extend(self.backup_models)
+        models_to_try = self._text_models if use_backup else self._text_models[:1]
+        
+        # Serialize once; only the model changes between attempts
+        body = self._serialize_payload(payload)
         
         last_error = None
         for i, model in enumerate(models_to_try):
@@ -147,7 +210,8 @@ class OpenRouterClient:
                 result = self._make_request(
                     model=model,
                     payload=payload,
-                    use_backup=(i > 0)
+                    use_backup=(i > 0),
+                    body=body
                 )
                 if i > 0:
                     print(f"[INFO] Using backup model: {model} (primary model unavailable)")
@@ -172,23 +236,24 @@ class OpenRouterClient:
             List of model dictionaries
         """
         try:
-            response = requests.get(
+            response = self._session.get(
                 f"{self.base_url}/models",
-                headers=self.headers,
                 timeout=30
             )
             response.raise_for_status()
-            return response.json().get("data", [])
+            return _loads_response(response).get("data", [])
         except requests.exceptions.RequestException as e:
             raise Exception(f"Error fetching models: {str(e)}")
     
     def change_model(self, model: str):
         """Change the primary model being used"""
         self.model = model
+        self._refresh_model_lists()
     
     def set_backup_models(self, backup_models: List[str]):
         """Set backup models to use if primary fails"""
         self.backup_models = backup_models
+        self._refresh_model_lists()
     
     def analyze_image(
         self,
@@ -197,7 +262,8 @@ class OpenRouterClient:
         model: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 1000,
-        use_backup: bool = True
+        use_backup: bool = True,
+        **kwargs
     ) -> Dict:
         """
         Analyze an image using a multimodal model
@@ -209,6 +275,43 @@ class OpenRouterClient:
             temperature: Sampling temperature
             max_tokens: Maximum tokens to generate
             use_backup: If True, try backup models if primary fails
+            **kwargs: Additional parameters to pass to API (e.g., response_format)
+        
+        Returns:
+            Dict with "content" (analysis text), "model_used", and "was_backup"
+        """
+        return self.analyze_images(
+            images_base64=[image_base64],
+            prompt=prompt,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            use_backup=use_backup,
+            **kwargs
+        )
+    
+    def analyze_images(
+        self,
+        images_base64: List[str],
+        prompt: str,
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        use_backup: bool = True,
+        **kwargs
+    ) -> Dict:
+        """
+        Analyze one or more images in a single multimodal request
+        
+        Args:
+            images_base64: Base64 encoded image strings (with or without data URL prefix),
+                           attached in order after the prompt
+            prompt: Text prompt describing what to analyze
+            model: Vision model to use (defaults to gpt-4-turbo if not specified)
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+            use_backup: If True, try backup models if primary fails
+            **kwargs: Additional parameters to pass to API (e.g., response_format)
         
         Returns:
             Dict with "content" (analysis text), "model_used", and "was_backup"
@@ -216,49 +319,48 @@ class OpenRouterClient:
         # Use vision model if not specified
         vision_model = model or "openai/gpt-4-turbo"
         
-        # Clean up base64 string (remove data URL prefix if present)
-        if image_base64.startswith("data:image"):
-            # Extract base64 part after comma
-            image_base64 = image_base64.split(",")[1]
-        
-        # Determine image format from base64 or default to jpeg
-        # For OpenRouter, we'll use the standard format
-        image_url = f"data:image/jpeg;base64,{image_base64}"
+        content = [
+            {
+                "type": "text",
+                "text": prompt
+            }
+        ]
+        for image_base64 in images_base64:
+            # Pass data URLs through untouched; wrap raw base64 as jpeg
+            if image_base64.startswith("data:image"):
+                image_url = image_base64
+            else:
+                image_url = "data:image/jpeg;base64," + image_base64
+            
+            content.append({
+                "type": "image_url",
+                "image_url": {
+                    "url": image_url
+                }
+            })
         
         # Format messages for multimodal API
         messages = [
             {
                 "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": prompt
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": image_url
-                        }
-                    }
-                ]
+                "content": content
             }
         ]
         
         payload = {
             "messages": messages,
             "temperature": temperature,
-            "max_tokens": max_tokens
+            "max_tokens": max_tokens,
+            **kwargs
         }
         
-        # Try primary vision model first, then backups
+        # Try primary vision model first, then vision-capable backups
         models_to_try = [vision_model]
-        if use_backup and self.backup_models:
-            # Filter backup models to only vision-capable ones
-            vision_backups = [
-                m for m in self.backup_models 
-                if any(vision_keyword in m.lower() for vision_keyword in ["gpt-4", "claude-3", "gemini", "vision"])
-            ]
-            models_to_try.extend(vision_backups)
+        if use_backup:
+            models_to_try.extend(self._vision_backups)
+        
+        # Serialize once; only the model changes between attempts
+        body = self._serialize_payload(payload)
         
         last_error = None
         for i, model_name in enumerate(models_to_try):
@@ -266,7 +368,8 @@ class OpenRouterClient:
                 result = self._make_request(
                     model=model_name,
                     payload=payload,
-                    use_backup=(i > 0)
+                    use_backup=(i > 0),
+                    body=body
                 )
                 if i > 0:
                     print(f"[INFO] Using backup vision model: {model_name} (primary model unavailable)")
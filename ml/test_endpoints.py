@@ -3,12 +3,15 @@ API Endpoint Testing Utility
 Test the /detectscreen and /detectcamera endpoints with images.
 NOT for production use.
 """
-import base64
+import os
 import sys
-import argparse
-import json
-import requests
-from pathlib import Path
+from typing import Optional
+
+# Prefer the SIMD-accelerated pybase64; fall back to the standard library
+try:
+    from pybase64 import b64encode
+except ImportError:
+    from base64 import b64encode
 
 
 def image_to_base64(image_path: str) -> str:
@@ -21,86 +24,75 @@ def image_to_base64(image_path: str) -> str:
     Returns:
         Base64 encoded string
     """
-    image_path = Path(image_path)
-    
-    if not image_path.exists():
-        raise FileNotFoundError(f"Image file not found: {image_path}")
-    
-    # Read image file
+    # Read image file (open() raises FileNotFoundError for a missing path)
     with open(image_path, 'rb') as image_file:
         image_data = image_file.read()
     
     # Encode to base64
-    base64_string = base64.b64encode(image_data).decode('utf-8')
+    base64_string = b64encode(image_data).decode('utf-8')
     return base64_string
 
 
-def test_detectcamera_endpoint(image_path: str, endpoint_url: str = "http://localhost:8081/detectcamera"):
+def encode_into(out_buf: bytearray, image_path: str, read_buf: Optional[bytearray] = None) -> int:
     """
-    Test the /detectcamera endpoint by sending an image and displaying the LLM analysis.
+    Base64-encode an image file into a caller-provided buffer.
+    Meant for benchmark loops: pass the same buffers on every call so they are reused.
     
     Args:
+        out_buf: Buffer that receives the base64 bytes (resized in place)
         image_path: Path to the image file
-        endpoint_url: URL of the detectcamera endpoint
-    """
-    print(f"Converting image to base64...")
-    base64_string = image_to_base64(image_path)
-    print(f"Image converted (length: {len(base64_string)} characters)")
-    print(f"\nSending to {endpoint_url}...")
+        read_buf: Optional scratch buffer for the raw file bytes (grown when too small)
     
-    try:
-        # Prepare request
-        payload = {
-            "image": base64_string
-        }
-        
-        # Send request
-        response = requests.post(
-            endpoint_url,
-            json=payload,
-            headers={"Content-Type": "application/json"},
-            timeout=60  # Vision models can take a while
-        )
+    Returns:
+        Number of base64 bytes written to out_buf
+    """
+    with open(image_path, 'rb', buffering=0) as image_file:
+        size = os.fstat(image_file.fileno()).st_size
+        if read_buf is None:
+            read_buf = bytearray(size)
+        elif len(read_buf) < size:
+            read_buf.extend(bytes(size - len(read_buf)))
         
-        # Check response
-        if response.status_code == 200:
-            result = response.json()
-            print("\n" + "="*60)
-            print("CAMERA DETECTION RESULTS")
-            print("="*60)
-            print("\n" + json.dumps(result, indent=2))
-            print("="*60)
-            
-            return 0
-        else:
-            print(f"\nError: Endpoint returned status code {response.status_code}")
-            try:
-                error_data = response.json()
-                print(f"Error details: {json.dumps(error_data, indent=2)}")
-            except:
-                print(f"Response: {response.text}")
-            return 1
-            
-    except requests.exceptions.ConnectionError:
-        print(f"\nError: Could not connect to {endpoint_url}")
-        print("Make sure the API server is running (python api_server.py)")
-        return 1
-    except requests.exceptions.Timeout:
-        print(f"\nError: Request timed out (took longer than 60 seconds)")
-        return 1
-    except Exception as e:
-        print(f"\nError: {e}")
-        return 1
+        with memoryview(read_buf) as view:
+            data = view[:size]
+            # Read straight into the scratch buffer, no intermediate bytes object
+            filled = 0
+            while filled < size:
+                n = image_file.readinto(data[filled:])
+                if not n:
+                    break
+                filled += n
+            out_buf[:] = b64encode(data[:filled])
+            data.release()
+    
+    return len(out_buf)
+
+
+_session = None
+
 
+def _get_session():
+    """Get the shared requests session (created on first use so importing stays cheap)"""
+    global _session
+    if _session is None:
+        import requests
+        _session = requests.Session()
+    return _session
 
-def test_detectscreen_endpoint(image_path: str, endpoint_url: str = "http://localhost:8081/detectscreen"):
+
+def test_endpoint(image_path: str, endpoint_url: str, label: str):
     """
-    Test the /detectscreen endpoint by sending an image and displaying the LLM analysis.
+    Test a detection endpoint by sending an image and displaying the LLM analysis.
     
     Args:
         image_path: Path to the image file
-        endpoint_url: URL of the detectscreen endpoint
+        endpoint_url: URL of the endpoint (e.g. .../detectcamera or .../detectscreen)
+        label: Name shown in the results header (e.g. "CAMERA" or "SCREEN")
     """
+    # Imported here so --help and usage errors don't pay for loading requests
+    import json
+    import requests
+    
     print(f"Converting image to base64...")
     base64_string = image_to_base64(image_path)
     print(f"Image converted (length: {len(base64_string)} characters)")
@@ -113,7 +105,7 @@ def test_detectscreen_endpoint(image_path: str, endpoint_url: str = "http://loca
         }
         
         # Send request
-        response = requests.post(
+        response = _get_session().post(
             endpoint_url,
             json=payload,
             headers={"Content-Type": "application/json"},
@@ -124,7 +116,7 @@ def test_detectscreen_endpoint(image_path: str, endpoint_url: str = "http://loca
         if response.status_code == 200:
             result = response.json()
             print("\n" + "="*60)
-            print("SCREEN DETECTION RESULTS")
+            print(f"{label} DETECTION RESULTS")
             print("="*60)
             print("\n" + json.dumps(result, indent=2))
             print("="*60)
@@ -152,6 +144,8 @@ def test_detectscreen_endpoint(image_path: str, endpoint_url: str = "http://loca
 
 
 def main():
+    import argparse
+    
     parser = argparse.ArgumentParser(
         description='Test API endpoints with images',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -192,10 +186,10 @@ Examples:
     # Set endpoint URL
     if args.camera:
         endpoint_url = args.url or "http://localhost:8081/detectcamera"
-        return test_detectcamera_endpoint(args.image, endpoint_url)
+        return test_endpoint(args.image, endpoint_url, "CAMERA")
     else:  # args.screen
         endpoint_url = args.url or "http://localhost:8081/detectscreen"
-        return test_detectscreen_endpoint(args.image, endpoint_url)
+        return test_endpoint(args.image, endpoint_url, "SCREEN")
 
 
 if __name__ == '__main__':
@@ -3,10 +3,26 @@ Tools/functions that can be called by the AI assistant
 """
 import re
 import requests
+from requests.adapters import HTTPAdapter
+import sched
 import time
 import threading
 from typing import Dict, Optional
 
+# hh:mm:ss or mm:ss
+_TIME_PARSE_RE = re.compile(r'^(\d{1,2}):(\d{1,2})(?::(\d{1,2}))?$')
+
+# Finds a time in various formats with a single scan; the named group that
+# matched says which format it was
+_TIME_EXTRACT_RE = re.compile(
+    r'(?P<hms>\d{1,2}:\d{2}:\d{2})'        # hh:mm:ss
+    r'|(?P<ms>\d{1,2}:\d{2})'              # mm:ss
+    r'|(?P<sec>\d+)\s*(?:seconds?|sec)'    # "30 seconds"
+    r'|(?P<min>\d+)\s*(?:minutes?|min)'    # "5 minutes"
+    r'|(?P<hr>\d+)\s*(?:hours?|hr)',       # "2 hours"
+    re.IGNORECASE
+)
+
 
 def parse_time_to_seconds(time_str: str) -> Optional[int]:
     """
@@ -21,9 +37,8 @@ def parse_time_to_seconds(time_str: str) -> Optional[int]:
     # Remove whitespace
     time_str = time_str.strip()
     
-    # Pattern to match hh:mm:ss, mm:ss, or just seconds
-    pattern = r'^(\d{1,2}):(\d{1,2})(?::(\d{1,2}))?$'
-    match = re.match(pattern, time_str)
+    # Match hh:mm:ss or mm:ss (plain seconds are handled below)
+    match = _TIME_PARSE_RE.match(time_str)
     
     if match:
         parts = match.groups()
@@ -57,55 +72,68 @@ def extract_time_from_text(text: str) -> Optional[str]:
     Returns:
         Time string in hh:mm:ss format or None
     """
-    # Pattern to find time in various formats
-    patterns = [
-        r'(\d{1,2}):(\d{2}):(\d{2})',  # hh:mm:ss
-        r'(\d{1,2}):(\d{2})',           # mm:ss
-        r'(\d+)\s*(?:seconds?|sec)',    # "30 seconds"
-        r'(\d+)\s*(?:minutes?|min)',    # "5 minutes"
-        r'(\d+)\s*(?:hours?|hr)',       # "2 hours"
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text.lower())
-        if match:
-            if ':' in match.group(0):
-                # Already in time format
-                time_str = match.group(0)
-                # Normalize to hh:mm:ss
-                parts = time_str.split(':')
-                if len(parts) == 2:
-                    # mm:ss -> 00:mm:ss
-                    return f"00:{parts[0].zfill(2)}:{parts[1].zfill(2)}"
-                elif len(parts) == 3:
-                    # hh:mm:ss
-                    return f"{parts[0].zfill(2)}:{parts[1].zfill(2)}:{parts[2].zfill(2)}"
-            else:
-                # Extract number and unit
-                num = int(match.group(1))
-                unit = match.group(0).lower()
-                
-                if 'hour' in unit or 'hr' in unit:
-                    return f"{num:02d}:00:00"
-                elif 'minute' in unit or 'min' in unit:
-                    return f"00:{num:02d}:00"
-                elif 'second' in unit or 'sec' in unit:
-                    return f"00:00:{num:02d}"
-    
-    return None
+    match = _TIME_EXTRACT_RE.search(text)
+    if not match:
+        return None
+    
+    kind = match.lastgroup
+    value = match.group(kind)
+    
+    if kind == 'hms':
+        # hh:mm:ss
+        hours, minutes, seconds = value.split(':')
+        return f"{hours.zfill(2)}:{minutes}:{seconds}"
+    elif kind == 'ms':
+        # mm:ss -> 00:mm:ss
+        minutes, seconds = value.split(':')
+        return f"00:{minutes.zfill(2)}:{seconds}"
+    
+    # Number with a unit
+    num = int(value)
+    if kind == 'hr':
+        return f"{num:02d}:00:00"
+    elif kind == 'min':
+        return f"00:{num:02d}:00"
+    else:
+        return f"00:00:{num:02d}"
+
+
+def _wait_for_timer(timeout: float):
+    """Scheduler delay function: sleeps until the next timer is due or a new timer is added"""
+    _timer_wakeup.wait(timeout)
+    _timer_wakeup.clear()
 
 
-def _timer_worker(seconds: int, formatted_time: str):
+# All timers share one scheduler and one (lazily started) background thread
+_timer_wakeup = threading.Event()
+_timer_scheduler = sched.scheduler(time.monotonic, _wait_for_timer)
+_timer_lock = threading.Lock()
+_timer_thread: Optional[threading.Thread] = None
+
+# Shared session so timer notifications reuse the connection to the frontend
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+
+def _run_timers():
+    """Run due timers until none are pending, then let the thread exit"""
+    global _timer_thread
+    while True:
+        _timer_scheduler.run()
+        with _timer_lock:
+            if _timer_scheduler.empty():
+                _timer_thread = None
+                return
+
+
+def _fire_timer(seconds: int, formatted_time: str):
     """
-    Background worker that waits for the timer and sends to frontend
+    Called when a timer completes: notify the frontend
     
     Args:
         seconds: Total seconds for the timer
         formatted_time: Formatted time string (hh:mm:ss)
     """
-    # Wait for the timer duration
-    time.sleep(seconds)
-    
     # Send to frontend when timer completes
     payload = {
         "time": formatted_time,
@@ -113,7 +141,7 @@ def _timer_worker(seconds: int, formatted_time: str):
     }
     
     try:
-        response = requests.post(
+        response = _SESSION.post(
             "http://localhost:4000/setTimer",
             json=payload,
             timeout=5
@@ -149,13 +177,14 @@ def set_timer(time_str: str) -> Dict:
     secs = seconds % 60
     formatted_time = f"{hours:02d}:{minutes:02d}:{secs:02d}"
     
-    # Start timer in background thread (non-blocking)
-    timer_thread = threading.Thread(
-        target=_timer_worker,
-        args=(seconds, formatted_time),
-        daemon=True
-    )
-    timer_thread.start()
+    # Schedule the timer on the shared background thread (non-blocking)
+    global _timer_thread
+    with _timer_lock:
+        _timer_scheduler.enter(seconds, 1, _fire_timer, argument=(seconds, formatted_time))
+        if _timer_thread is None:
+            _timer_thread = threading.Thread(target=_run_timers, name='pika-timers', daemon=True)
+            _timer_thread.start()
+    _timer_wakeup.set()  # Re-check the queue in case this timer is due first
     
     return {
         "success": True,